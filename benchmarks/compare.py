@@ -0,0 +1,51 @@
+'''
+Compare two benchmark result files written by run.py.
+
+	python benchmarks/compare.py before.json after.json --threshold 0.15
+
+Prints the change for every benchmark in both files and exits with status
+1 if any got slower by more than the threshold (a fraction, default 0.1).
+
+'''
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+	with open(path) as results:
+		return json.load(results)['seconds_per_call']
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Compare two konval benchmark runs.')
+	parser.add_argument('before')
+	parser.add_argument('after')
+	parser.add_argument('-t', '--threshold', type=float, default=0.1,
+		help='relative slowdown that counts as a regression (default 0.1)')
+	args = parser.parse_args(argv)
+
+	before = load(args.before)
+	after = load(args.after)
+
+	regressions = []
+	for name in sorted(set(before) & set(after)):
+		change = after[name] / before[name] - 1.0
+		marker = ''
+		if change > args.threshold:
+			marker = '  REGRESSION'
+			regressions.append(name)
+		print '%-60s %10.0f ns %10.0f ns %+7.1f%%%s' % (name, before[name] * 1e9, after[name] * 1e9, change * 100, marker)
+
+	for name in sorted(set(after) - set(before)):
+		print '%-60s %13s %10.0f ns' % (name, 'new', after[name] * 1e9)
+
+	if regressions:
+		print '\n%d benchmark(s) slower by more than %.0f%%' % (len(regressions), args.threshold * 100)
+		return 1
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
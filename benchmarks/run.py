@@ -0,0 +1,352 @@
+'''
+Micro and macro benchmarks for konval.
+
+Micro benchmarks time every built-in validator on an accepted and a
+rejected value, both through the raising interface (__call__) and through
+attempt. Macro benchmarks run whole records through validate, a compiled
+schema, a generated schema and validate_many, and re-validate one changed
+field of each, with mostly valid and mostly invalid input; each scenario
+checks that it rejects about the intended share of records. Import
+benchmarks time importing konval in a fresh interpreter.
+
+	python benchmarks/run.py -o before.json
+	python benchmarks/run.py -o after.json
+	python benchmarks/compare.py before.json after.json
+
+With -k, only the benchmarks whose names contain the given text are run.
+
+Inputs are generated from a fixed seed, so runs on the same machine are
+comparable between commits.
+
+'''
+
+import argparse
+import datetime
+import inspect
+import json
+import math
+import os
+import platform
+import random
+import subprocess
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import konval
+from konval import caching, codegen, containers, network, numbers, resultset, strings, types, vocabulary
+from konval.meta import standard
+
+
+# (name, factory, accepted value, rejected value or NO_FAILURE)
+NO_FAILURE = object()
+
+CASES = [
+	('Konvalidator', lambda: konval.Konvalidator(), 1, NO_FAILURE),
+	('Or', lambda: konval.Or((types.IsType(str), types.IsType(int))), 1, 1.5),
+	('Or.adaptive', lambda: konval.Or((types.IsType(str), types.IsType(float), types.IsType(int)), adaptive=True), 1, None),
+	('And', lambda: konval.And((types.ToType(int), numbers.Range(1, 10))), '5', '50'),
+	('And.adaptive', lambda: konval.And((strings.IsRegexMatch(r'^[a-z]+$'), strings.LengthRange(2, 4)), adaptive=True), u'abc', u'abcdefg'),
+	('If', lambda: konval.If(True, types.ToType(int)), '5', 'x'),
+	('IfElse', lambda: konval.IfElse(types.IsType(int), types.ToType(int)), '5', 'x'),
+	('Default', lambda: konval.Default(types.ToType(int), 0), '5', NO_FAILURE),
+	('Constant', lambda: konval.Constant(1), 'x', NO_FAILURE),
+	('caching.Cached', lambda: caching.Cached(standard.IsEmailAddress()), 'pma@agapow.net', 'not an address'),
+
+	('strings.IsNonBlank', lambda: strings.IsNonBlank(), u'abc', u''),
+	('strings.ToStripped', lambda: strings.ToStripped(), u'  abc  ', 1),
+	('strings.ToLower', lambda: strings.ToLower(), u'ABC', 1),
+	('strings.ToUpper', lambda: strings.ToUpper(), u'abc', 1),
+	('strings.ToString', lambda: strings.ToString(), 123, NO_FAILURE),
+	('strings.ToDecoded', lambda: strings.ToDecoded(), bytearray(b'abc'), b'\xff'),
+	('strings.IsRegexMatch.memoryview', lambda: strings.IsRegexMatch(r'^[a-z]+[0-9]*$'), memoryview(b'abc123'), memoryview(b'123abc')),
+	('strings.IsRegexMatch', lambda: strings.IsRegexMatch(r'^[a-z]+[0-9]*$'), u'abc123', u'123abc'),
+	('strings.RegexSet', lambda: strings.RegexSet([r'^[0-9]{3}-[0-9]{4}$', r'^[A-Z]{2}[0-9]+$', r'^x+$']), u'AB1234', u'??'),
+	('strings.ToCanonical', lambda: strings.ToCanonical(), u' Foo-Bar baz ', 1),
+	('strings.ToSlug', lambda: strings.ToSlug(), u'Hello, World!', 1),
+	('strings.LengthRange', lambda: strings.LengthRange(2, 10), u'abcd', u'a'),
+	('strings.LengthMinimum', lambda: strings.LengthMinimum(2), u'abcd', u'a'),
+	('strings.LengthMaximum', lambda: strings.LengthMaximum(2), u'a', u'abcd'),
+	('strings.LengthBetween', lambda: strings.LengthBetween(1, 5), u'abc', u'a'),
+
+	('numbers.Range', lambda: numbers.Range(1, 10), 5, 50),
+	('numbers.Minimum', lambda: numbers.Minimum(1), 5, -5),
+	('numbers.Maximum', lambda: numbers.Maximum(10), 5, 50),
+	('numbers.Between', lambda: numbers.Between(1, 10), 5, 10),
+	('numbers.IsEqual', lambda: numbers.IsEqual(5), 5, 6),
+	('numbers.IsZero', lambda: numbers.IsZero(), 0, 1),
+
+	('types.ToType', lambda: types.ToType(int), '5', 'x'),
+	('types.IsInstance', lambda: types.IsInstance([int]), 5, 'x'),
+	('types.IsType', lambda: types.IsType([int, long]), 5, 'x'),
+
+	('containers.ToLength', lambda: containers.ToLength(), [1, 2, 3], None),
+	('containers.LengthRange', lambda: containers.LengthRange(1, 5), [1, 2, 3], []),
+	('containers.IsEmpty', lambda: containers.IsEmpty(), [], [1]),
+	('containers.IsNotEmpty', lambda: containers.IsNotEmpty(), [1], []),
+
+	('containers.EachItem', lambda: containers.EachItem(types.ToType(int)), ['1', '2', '3'], ['1', 'x', '3']),
+	('containers.ListOf', lambda: containers.ListOf(types.ToType(int), 1, 5), ['1', '2', '3'], ['1'] * 10),
+	('containers.DictOf', lambda: containers.DictOf(strings.ToLower(), types.ToType(int)), {u'A': '1', u'B': '2'}, {u'A': 'x'}),
+
+	('vocabulary.Synonyms', lambda: vocabulary.Synonyms({'y': True, 'n': False}), 'y', 'maybe'),
+	('vocabulary.InList', lambda: vocabulary.InList(['red', 'green', 'blue']), 'blue', 'pink'),
+
+	('vocabulary.InVocabulary', lambda: vocabulary.InVocabulary(['red', 'green', 'blue'], canonical=True), ' Blue ', 'pink'),
+
+	('network.IsIpv4Address', lambda: network.IsIpv4Address(), '192.168.0.1', '192.168.0.300'),
+	('network.IsIpv6Address', lambda: network.IsIpv6Address(), '2001:db8::8a2e:370:7334', '2001:db8::8a2e::7334'),
+	('network.ToIpv4Address', lambda: network.ToIpv4Address(), '192.168.0.1', '192.168.0.300'),
+	('network.ToIpv6Address', lambda: network.ToIpv6Address(), '2001:db8::8a2e:370:7334', '2001:db8::8a2e::7334'),
+	('network.IsIpv4Network', lambda: network.IsIpv4Network(), '10.0.0.0/8', '10.0.0.1/8'),
+	('network.IsIpv6Network', lambda: network.IsIpv6Network(), '2001:db8::/32', '2001:db8::1/32'),
+
+	('standard.IsAlpha', lambda: standard.IsAlpha(), 'Hello World', 'Hello 123'),
+	('standard.IsAlphaNumeric', lambda: standard.IsAlphaNumeric(), 'Hello 123', 'Hello!'),
+	('standard.IsEmailAddress', lambda: standard.IsEmailAddress(), 'pma@agapow.net', 'pma at agapow'),
+	('standard.IsName', lambda: standard.IsName(), 'Peter M. Elias', 'R2D2'),
+	('standard.IsIpv4', lambda: standard.IsIpv4(), '192.168.0.1', '192.168.0.300'),
+	('standard.IsIpv4.bytearray', lambda: standard.IsIpv4(), bytearray(b'192.168.0.1'), bytearray(b'192.168.0.300')),
+]
+
+COVERED_MODULES = [konval.base, caching, containers, network, numbers, strings, types, vocabulary, standard]
+
+ABSTRACT = set([numbers.ArrayKonvalidator, network._AddressValidator, network._NetworkValidator])
+
+
+def check_coverage():
+	'''
+	Fail loudly if a validator class has no micro benchmark.
+
+	'''
+	covered = set(type(factory()) for _, factory, _, _ in CASES)
+	missing = []
+	for module in COVERED_MODULES:
+		for name, obj in vars(module).items():
+			if (inspect.isclass(obj) and issubclass(obj, konval.Konvalidator)
+					and obj.__module__ == module.__name__ and obj not in ABSTRACT and obj not in covered):
+				missing.append('%s.%s' % (module.__name__, name))
+	if missing:
+		raise SystemExit('No benchmark for: %s' % ', '.join(sorted(missing)))
+
+
+def best_time(function, value, number, repeat):
+	timer = timeit.default_timer
+	best = None
+	for _ in xrange(repeat):
+		start = timer()
+		for _ in xrange(number):
+			function(value)
+		elapsed = timer() - start
+		if best is None or elapsed < best:
+			best = elapsed
+	return best / number
+
+
+def catching(validator):
+	def run(value):
+		try:
+			validator(value)
+		except konval.KonvalError:
+			pass
+	return run
+
+
+def everything(name):
+	return True
+
+
+def run_micro(number, repeat, wanted=everything):
+	results = {}
+	for name, factory, accepted, rejected in CASES:
+		validator = factory()
+		cases = [('valid', accepted)]
+		if rejected is not NO_FAILURE:
+			cases.append(('invalid', rejected))
+		for label, value in cases:
+			for method, function in [('call', catching(validator)), ('attempt', validator.attempt)]:
+				key = 'micro.%s.%s.%s' % (name, method, label)
+				if wanted(key):
+					results[key] = best_time(function, value, number, repeat)
+		key = 'micro.%s.construct' % name
+		if wanted(key):
+			results[key] = best_time(lambda _: factory(), None, number, repeat)
+	return results
+
+
+COUNTRIES = ['gb', 'us', 'nz', 'de', 'fr', 'jp', 'br', 'in', 'za', 'au']
+
+SIGNUP_SCHEMA = {
+	u'name': standard.IsName(),
+	u'email': standard.IsEmailAddress(),
+	u'age': konval.And((types.ToType(int), numbers.Range(13, 120)), 'Age {value} is out of range'),
+	u'ip': standard.IsIpv4(),
+	u'country': konval.And((strings.ToLower(), vocabulary.InList(COUNTRIES))),
+	u'nickname': konval.Default(konval.And((strings.ToStripped(), strings.LengthBetween(2, 20))), None),
+	u'newsletter': vocabulary.Synonyms({'yes': True, 'no': False}),
+	u'username': konval.And((types.ToType(unicode),
+		konval.Or((strings.IsRegexMatch(r'^[a-z]{3,12}$'), strings.IsRegexMatch(r'^user[0-9]+$'))))),
+}
+
+
+def make_record(rng, valid):
+	record = {
+		u'name': rng.choice(['Peter M. Elias', 'Ann Smith', 'Jo Bloggs']),
+		u'email': '%s@example.com' % rng.choice(['pma', 'ann.smith', 'jo']),
+		u'age': str(rng.randint(13, 120)),
+		u'ip': '10.%d.%d.%d' % (rng.randint(0, 255), rng.randint(0, 255), rng.randint(0, 255)),
+		u'country': rng.choice(COUNTRIES).upper(),
+		u'nickname': '  %s  ' % rng.choice(['pete', 'annie', 'jo-jo']),
+		u'newsletter': rng.choice(['yes', 'no']),
+		u'username': rng.choice(['peter', 'user%d' % rng.randint(0, 999)]),
+	}
+	if not valid:
+		for name in rng.sample(sorted(record), rng.randint(1, 4)):
+			record[name] = rng.choice([12345, 'R2D2!!', '', '999.1.1.1', 'maybe', None])
+	return record
+
+
+def make_records(count, invalid_fraction, seed=42):
+	rng = random.Random(seed)
+	return [make_record(rng, rng.random() >= invalid_fraction) for _ in xrange(count)]
+
+
+def check_invalid_fraction(compiled, records, target):
+	'''
+	Make sure a scenario rejects about the intended share of its records.
+
+	'''
+	measured = sum(not compiled.validate(record).is_valid() for record in records) / float(len(records))
+	# some corrupted records still pass, as nickname falls back to a default
+	tolerance = max(0.05, 3 * math.sqrt(target * (1 - target) / len(records)))
+	if abs(measured - target) > tolerance:
+		raise AssertionError('%.0f%% of records are invalid, expected about %.0f%%' % (100 * measured, 100 * target))
+
+
+MACRO_SCENARIOS = [('valid_heavy', 0.05), ('invalid_heavy', 0.6)]
+
+MACRO_BENCHMARKS = ['validate', 'compiled', 'generated', 'validate_many', 'resultset', 'revalidate']
+
+
+def run_macro(count, repeat, wanted=everything):
+	results = {}
+	compiled = konval.compile(SIGNUP_SCHEMA)
+	generated = None
+	for label, invalid_fraction in MACRO_SCENARIOS:
+		names = [name for name in MACRO_BENCHMARKS if wanted('macro.signup.%s.%s' % (name, label))]
+		pack = wanted('macro.ipv4.pack.%s' % label)
+		if not names and not pack:
+			continue
+		records = make_records(count, invalid_fraction)
+		check_invalid_fraction(compiled, records, invalid_fraction)
+		if generated is None and 'generated' in names:
+			generated = codegen.GeneratedSchema(SIGNUP_SCHEMA, cache_dir=False)
+
+		def validate_each(_):
+			for record in records:
+				konval.validate(SIGNUP_SCHEMA, record)
+
+		def validate_compiled(_):
+			for record in records:
+				compiled.validate(record)
+
+		def validate_generated(_):
+			for record in records:
+				generated.validate(record)
+
+		def validate_many(_):
+			for _ in konval.validate_many(compiled, records):
+				pass
+
+		def collect_results(_):
+			resultset.ResultSet.collect(compiled, records)
+
+		previous = [compiled.validate(record) for record in records] if 'revalidate' in names else None
+
+		def revalidate_one_field(_):
+			for record, result in zip(records, previous):
+				compiled.revalidate(result, {u'nickname': record.get(u'nickname')})
+
+		addresses = [record[u'ip'] for record in records]
+
+		def pack_addresses(_):
+			network.IsIpv4Address().pack(addresses)
+
+		if pack:
+			results['macro.ipv4.pack.%s' % label] = best_time(pack_addresses, None, 1, repeat) / count
+
+		functions = {'validate': validate_each, 'compiled': validate_compiled, 'generated': validate_generated,
+			'validate_many': validate_many, 'resultset': collect_results, 'revalidate': revalidate_one_field}
+		for name in names:
+			results['macro.signup.%s.%s' % (name, label)] = best_time(functions[name], None, 1, repeat) / count
+	return results
+
+
+IMPORTED_MODULES = ['konval', 'konval.meta.standard', 'konval.meta.cli']
+
+IMPORT_SCRIPT = 'import time; start = time.time(); import %s; print time.time() - start'
+
+
+def run_imports(repeat, wanted=everything):
+	results = {}
+	root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+	for module in IMPORTED_MODULES:
+		if not wanted('import.%s' % module):
+			continue
+		timings = [float(subprocess.check_output([sys.executable, '-c', IMPORT_SCRIPT % module], cwd=root))
+			for _ in xrange(repeat)]
+		results['import.%s' % module] = min(timings)
+	return results
+
+
+def git_revision():
+	try:
+		return subprocess.check_output(['git', 'rev-parse', 'HEAD'],
+			cwd=os.path.dirname(os.path.abspath(__file__)), stderr=open(os.devnull, 'w')).strip()
+	except (OSError, subprocess.CalledProcessError):
+		return None
+
+
+def main(argv=None):
+	parser = argparse.ArgumentParser(description='Run the konval benchmarks.')
+	parser.add_argument('-o', '--output', help='write results as JSON to this file')
+	parser.add_argument('-n', '--number', type=int, default=2000, help='calls per micro benchmark timing')
+	parser.add_argument('-r', '--repeat', type=int, default=5, help='timings per benchmark, the best is kept')
+	parser.add_argument('-m', '--records', type=int, default=2000, help='records per macro benchmark')
+	parser.add_argument('-k', '--filter', help='only run benchmarks whose name contains this')
+	args = parser.parse_args(argv)
+
+	check_coverage()
+
+	wanted = everything
+	if args.filter:
+		wanted = lambda name: args.filter in name
+
+	results = {}
+	results.update(run_micro(args.number, args.repeat, wanted))
+	results.update(run_macro(args.records, args.repeat, wanted))
+	results.update(run_imports(args.repeat, wanted))
+
+	for name in sorted(results):
+		print '%-60s %12.0f ns' % (name, results[name] * 1e9)
+
+	if args.output:
+		report = {
+			'meta': {
+				'revision': git_revision(),
+				'python': platform.python_version(),
+				'platform': platform.platform(),
+				'date': datetime.datetime.utcnow().isoformat(),
+				'number': args.number,
+				'repeat': args.repeat,
+				'records': args.records,
+			},
+			'seconds_per_call': results,
+		}
+		with open(args.output, 'w') as output:
+			json.dump(report, output, indent=1, sort_keys=True)
+
+
+if __name__ == '__main__':
+	main()
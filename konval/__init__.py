@@ -23,5 +23,36 @@ __version__ = "0.4"
 __author__ = "Paul-Michael Agapow, Peter M. Elias"
 __email__ = "pma@agapow.net"
 
+import importlib as _importlib
+import sys as _sys
+from types import ModuleType as _ModuleType
+
 from base import *
-from base import canonicals, containers, numbers, strings, types, vocabulary
\ No newline at end of file
+
+# imported on first access, so that importing konval stays cheap
+_SUBMODULES = frozenset(['caching', 'canonicals', 'codegen', 'containers', 'network', 'numbers', 'parallel',
+	'profiling', 'resultset', 'strings', 'types', 'vocabulary'])
+
+
+class _LazyPackage(_ModuleType):
+	'''
+	The konval package, importing its submodules on first attribute access.
+
+	'''
+
+	def __getattr__(self, name):
+		if name not in _SUBMODULES:
+			raise AttributeError("'module' object has no attribute %r" % name)
+		module = _importlib.import_module('konval.base.' + name)
+		setattr(self, name, module)
+		return module
+
+	def __dir__(self):
+		return sorted(set(self.__dict__) | _SUBMODULES)
+
+
+_package = _LazyPackage(__name__, __doc__)
+_package.__dict__.update(_sys.modules[__name__].__dict__)
+# the original module must outlive the swap, or Python 2 clears its globals
+_package._module = _sys.modules[__name__]
+_sys.modules[__name__] = _package
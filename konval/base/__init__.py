@@ -1,9 +1,95 @@
+from repr import Repr
+import timeit
+import weakref
+
+FAILED = (False, None)
+
+_RAISING_METHODS = ('__call__', 'validate', 'validate_value', 'convert', 'convert_value')
+
+_registry = weakref.WeakValueDictionary()
+
+def _intern_key(value):
+	if type(value) is tuple:
+		return (tuple, tuple(_intern_key(v) for v in value))
+	return (type(value), value)
+
+def _frozen_setattr(self, name, value):
+	if getattr(self, '_frozen', False):
+		raise AttributeError('%s instances are immutable' % self.__class__.__name__)
+	object.__setattr__(self, name, value)
+
+def _frozen_delattr(self, name):
+	if getattr(self, '_frozen', False):
+		raise AttributeError('%s instances are immutable' % self.__class__.__name__)
+	object.__delattr__(self, name)
+
+def _rebuild(cls, args, kwargs):
+	return cls(*args, **kwargs)
+
+# shortens long arguments in reprs, which also label validators in profiles
+_param_repr = Repr()
+_param_repr.maxlist = _param_repr.maxtuple = _param_repr.maxdict = 10
+_param_repr.maxset = _param_repr.maxfrozenset = 10
+_param_repr.maxstring = 60
+_param_repr.maxother = 200
+
+class KonvalidatorType(type):
+	'''
+	The metaclass for konvalidators.
+
+	A class that overrides the raising interface but not attempt falls back
+	to the generic attempt, so a native check inherited from a built-in can
+	never bypass the subclass's own logic.
+
+	Classes that set interned in their own body are immutable once
+	constructed, and constructing one with the same (hashable) arguments
+	as a live instance returns that instance instead of building a new
+	one. Subclasses that don't set it themselves are ordinary, mutable
+	classes, so validators can still be extended as before.
+
+	The constructor arguments are kept for pickling and repr. An __init__
+	can set _init_args itself instead, to keep normalized arguments, or
+	None where the class pickles and prints itself without them.
+
+	'''
+
+	def __init__(cls, name, bases, attrs):
+		super(KonvalidatorType, cls).__init__(name, bases, attrs)
+		if 'attempt' not in attrs and any(m in attrs for m in _RAISING_METHODS):
+			cls.attempt = _generic_attempt
+		if attrs.get('interned'):
+			cls.__setattr__ = _frozen_setattr
+			cls.__delattr__ = _frozen_delattr
+
+	def __call__(cls, *args, **kwargs):
+		if not cls.__dict__.get('interned'):
+			return type.__call__(cls, *args, **kwargs)
+		key = (cls, _intern_key(args), tuple(sorted((k, _intern_key(v)) for k, v in kwargs.iteritems())))
+		try:
+			instance = _registry.get(key)
+		except TypeError:
+			key = None
+			instance = None
+		if instance is None:
+			instance = type.__call__(cls, *args, **kwargs)
+			try:
+				instance._init_args
+			except AttributeError:
+				object.__setattr__(instance, '_init_args', (args, kwargs))
+			object.__setattr__(instance, '_frozen', True)
+			if key is not None and instance._internable():
+				_registry[key] = instance
+		return instance
+
 class Konvalidator(object):
 	'''
 	The abstract base class for konvalidators.
 
 	Override validate_value for validation logic.
 	Override convert_vlaue for conversion logic.
+	Override attempt for a native, non-raising check.
+	Set io_bound on validators that wait on I/O, so that validate_async
+	runs them concurrently.
 	
 	Use ValidationError for validation exceptions
 	Use ConversionError for conversion exceptions
@@ -13,6 +99,27 @@ class Konvalidator(object):
 
 	'''
 
+	__metaclass__ = KonvalidatorType
+	__slots__ = ('__weakref__', '_frozen', '_init_args')
+
+	interned = False
+	io_bound = False
+
+	def __reduce_ex__ (self, protocol):
+		init_args = getattr(self, '_init_args', None)
+		if init_args is not None:
+			return (_rebuild, (self.__class__,) + init_args)
+		return object.__reduce_ex__(self, max(protocol, 2))
+
+	def __repr__ (self):
+		init_args = getattr(self, '_init_args', None)
+		if init_args is None:
+			return object.__repr__(self)
+		args, kwargs = init_args
+		params = [_param_repr.repr(arg) for arg in args]
+		params.extend('%s=%s' % (name, _param_repr.repr(value)) for name, value in sorted(kwargs.iteritems()))
+		return '%s(%s)' % (self.__class__.__name__, ', '.join(params))
+
 	def __call__ (self, value):
 		'''
 		Validates and converts user input.
@@ -27,6 +134,30 @@ class Konvalidator(object):
 		value = self.convert(value)
 		return value
 
+	def attempt (self, value):
+		'''
+		Validate and convert without raising.
+
+		Return (True, converted value) on success and FAILED on failure.
+		This generic version catches the exception from __call__.
+
+		'''
+		try:
+			return True, self(value)
+		except KonvalError:
+			return FAILED
+
+	def check (self, value):
+		'''
+		Return whether a value would be accepted, without raising.
+
+		'''
+		return self.attempt(value)[0]
+
+	def _internable (self):
+		# whether an interned instance may be shared by equal constructions
+		return True
+
 	def convert (self, value):
 		'''
 		The interface for invoking the converter
@@ -63,54 +194,282 @@ class Konvalidator(object):
 		'''
 		return True
 
-class Or(Konvalidator):
+# kept apart from the class, so classes made while a profiler is enabled don't copy its wrapper
+_generic_attempt = Konvalidator.__dict__['attempt']
+
+def attempt(validator, value):
+	'''
+	Call any validator without raising, returning (ok, converted value).
+
+	Plain callables without an attempt method are called and caught.
+
+	'''
+	validator_attempt = getattr(validator, 'attempt', None)
+	if validator_attempt is not None:
+		return validator_attempt(value)
+	try:
+		return True, validator(value)
+	except KonvalError:
+		return FAILED
+
+def _rank(cost, decide_rate):
+	# expected cost of a decisive outcome: cheap checks that often decide go first
+	if decide_rate <= 0:
+		return (float('inf'), cost)
+	return (cost / decide_rate, cost)
+
+class _Adaptive(object):
+	'''
+	Learns the cheapest order in which to try the branches of a combinator.
+
+	For each branch it records how often it was tried, how often it decided
+	the outcome (succeeded for Or, failed for And) and how long it took.
+	Every interval calls the branches are re-sorted by cost over decision
+	rate and the counts are halved, so the order follows changes in the
+	input. Updates from several threads may occasionally be lost, which
+	only blurs the statistics.
+
+	'''
+
+	__slots__ = ('order', 'frozen', 'converts', 'interval', 'countdown', 'tried', 'decided', 'elapsed')
+
+	def __init__(self, size, interval=256):
+		self.order = tuple(range(size))
+		self.frozen = False
+		self.converts = False
+		self.interval = interval
+		self.countdown = interval
+		self.tried = [0] * size
+		self.decided = [0] * size
+		self.elapsed = [0.0] * size
+
+	def first(self, validators, value):
+		'''
+		Return the outcome of the first branch, in learned order, that succeeds.
+
+		'''
+		if self.frozen:
+			for index in self.order:
+				outcome = attempt(validators[index], value)
+				if outcome[0]:
+					return outcome
+			return FAILED
+		timer = timeit.default_timer
+		result = FAILED
+		for index in self.order:
+			start = timer()
+			outcome = attempt(validators[index], value)
+			self._record(index, outcome[0], timer() - start)
+			if outcome[0]:
+				result = outcome
+				break
+		self._tick()
+		return result
+
+	def all(self, validators, value):
+		'''
+		Check value against every branch, in learned order, stopping at a failure.
+
+		Each branch sees the original value, which is only sound while no
+		branch converts it. Once one returns anything but the value itself,
+		this returns None, now and for every later call, and the caller
+		runs the branches in declared order instead.
+
+		'''
+		if self.converts:
+			return None
+		timer = None if self.frozen else timeit.default_timer
+		result = True, value
+		for index in self.order:
+			if timer is None:
+				ok, converted = attempt(validators[index], value)
+			else:
+				start = timer()
+				ok, converted = attempt(validators[index], value)
+				self._record(index, not ok, timer() - start)
+			if not ok:
+				result = FAILED
+				break
+			if converted is not value:
+				self.converts = True
+				return None
+		if timer is not None:
+			self._tick()
+		return result
+
+	def _record(self, index, decided, elapsed):
+		self.tried[index] += 1
+		self.decided[index] += decided
+		self.elapsed[index] += elapsed
+
+	def _tick(self):
+		self.countdown -= 1
+		if self.countdown <= 0:
+			self.countdown = self.interval
+			self.reorder()
+
+	def reorder(self):
+		tried, decided, elapsed = self.tried, self.decided, self.elapsed
+		ranks = {}
+		for position, index in enumerate(self.order):
+			if tried[index]:
+				ranks[index] = (_rank(elapsed[index] / tried[index], float(decided[index]) / tried[index]), position)
+			else:
+				# never reached: keep its place behind the branches that were
+				ranks[index] = ((float('inf'), float('inf')), position)
+			tried[index] //= 2
+			decided[index] //= 2
+			elapsed[index] /= 2
+		self.order = tuple(sorted(self.order, key=ranks.__getitem__))
+
+class _Reorderable(object):
+	'''
+	Inspecting and freezing the learned branch order of Or and And.
+
+	'''
+
+	__slots__ = ()
+
+	def _internable(self):
+		# learned order is per instance, so adaptive ones are never shared
+		return self.adaptive is None
+
+	@property
+	def order(self):
+		'''
+		The declared indices of the branches, in the order they are tried.
+
+		'''
+		if self.adaptive is None:
+			return tuple(range(len(self.validators)))
+		return self.adaptive.order
+
+	def freeze_order(self, order=None):
+		'''
+		Stop learning and keep the current order, or the one given.
+
+		'''
+		if self.adaptive is None:
+			raise ValueError('%r is not adaptive' % self)
+		if order is not None:
+			order = tuple(order)
+			if sorted(order) != range(len(self.validators)):
+				raise ValueError('%r is not an ordering of %d branches' % (order, len(self.validators)))
+			self.adaptive.order = order
+		self.adaptive.frozen = True
+
+	def thaw_order(self):
+		'''
+		Resume learning the branch order.
+
+		'''
+		if self.adaptive is None:
+			raise ValueError('%r is not adaptive' % self)
+		self.adaptive.frozen = False
+
+
+class Or(_Reorderable, Konvalidator):
 	'''
 	Given a list of validators, return the first that succeeds.
 	Raise last exception if none succeed.
-	
+
+	With adaptive=True, the branches are tried in the order that has proved
+	cheapest so far, which is learned as values are validated (see order,
+	freeze_order and thaw_order). This gives the same results only if at
+	most one branch can succeed for any value, or every branch that does
+	returns the same value, and all of them are pure. Each adaptive
+	instance learns on its own, so they are never interned.
+
 	'''
-	
-	def __init__(self, validators):
-		self.validators = validators
-	
+
+	__slots__ = ('validators', 'adaptive')
+	interned = True
+
+	def __init__(self, validators, adaptive=False):
+		# indexed when called, so any iterable of validators is taken
+		self.validators = tuple(validators)
+		# pickled and printed from the tuple, as a generator given is spent by now
+		object.__setattr__(self, '_init_args', ((self.validators,), {'adaptive': True} if adaptive else {}))
+		self.adaptive = _Adaptive(len(validators)) if adaptive else None
+
 	def __call__(self, value):
-		last_exception = None
-		for validator in self.validators:
-			try:
-				valid_value = validator(value)
+		validators = self.validators
+		if self.adaptive is not None:
+			ok, valid_value = self.adaptive.first(validators, value)
+			if ok:
 				return valid_value
-			except KonvalError as e:
-				last_exception = e
+			# fails again, raising the same error as in declared order
+			return validators[-1](value)
+		for i in xrange(len(validators) - 1):
+			ok, valid_value = attempt(validators[i], value)
+			if ok:
+				return valid_value
+		return validators[-1](value)
 
-		raise last_exception
+	def attempt(self, value):
+		if self.adaptive is not None:
+			return self.adaptive.first(self.validators, value)
+		for validator in self.validators:
+			outcome = attempt(validator, value)
+			if outcome[0]:
+				return outcome
+		return FAILED
 
 
-class And(Konvalidator):
+class And(_Reorderable, Konvalidator):
 	''' All validators must succeed. If a group specific error message is supplied
 		it will be raised, otherwise the first error raised is thrown. 
+
+		With adaptive=True, the validators are tried in the order that has
+		proved cheapest at finding failures, as for Or. Each then sees the
+		original value, so this only suits pure checks. As soon as one is
+		seen to convert a value, the And goes back to declared order for
+		good. A failing value is run again in declared order to raise the
+		same error as without adaptation.
 	'''
-	value = ''
 
-	def __init__(self, validators, error_message=None):
+	__slots__ = ('validators', 'error_message', 'adaptive')
+	interned = True
+
+	def __init__(self, validators, error_message=None, adaptive=False):
 		self.validators = validators
 		self.error_message = error_message
+		self.adaptive = _Adaptive(len(validators)) if adaptive else None
 
 	def __call__(self, value):
-		self.value = value
+		if self.adaptive is not None:
+			outcome = self.adaptive.all(self.validators, value)
+			if outcome is not None and outcome[0]:
+				return outcome[1]
 		current_value = value
 		for validator in self.validators:
 			try:
 				current_value = validator(current_value)
 			except KonvalError as e:
 				if self.error_message:
-					raise KonvalError(self.error_message.format(value=current_value))
+					raise KonvalError(self.error_message, code=getattr(e, 'code', None), validator=self,
+						value=current_value, fields={'value': current_value})
 				else:
 					raise e
 		return current_value
 
+	def attempt(self, value):
+		if self.adaptive is not None:
+			outcome = self.adaptive.all(self.validators, value)
+			if outcome is not None:
+				return outcome
+		for validator in self.validators:
+			ok, value = attempt(validator, value)
+			if not ok:
+				return FAILED
+		return True, value
+
 class If(Konvalidator):
 	''' If condition is satisfied, then validate / convert '''
 
+	__slots__ = ('condition', 'validator')
+	interned = True
+
 	def __init__(self, condition, validator):
 		self.condition = condition
 		self.validator = validator
@@ -120,18 +479,32 @@ class If(Konvalidator):
 			return self.validator(value)
 		return value
 
+	def attempt(self, value):
+		if self.condition:
+			return attempt(self.validator, value)
+		return True, value
+
 class IfElse(Konvalidator):
 	''' If first validator fails, try second one. '''
 
+	__slots__ = ('validator', 'other_validator')
+	interned = True
+
 	def __init__(self, validator, other_validator):
 		self.validator = validator
 		self.other_validator = other_validator
 
 	def __call__(self, value):
-		try:
-			return self.validator(value)
-		except KonvalError:
-			return self.other_validator(value)
+		ok, valid_value = attempt(self.validator, value)
+		if ok:
+			return valid_value
+		return self.other_validator(value)
+
+	def attempt(self, value):
+		outcome = attempt(self.validator, value)
+		if outcome[0]:
+			return outcome
+		return attempt(self.other_validator, value)
 
 class Default(Konvalidator):
 	'''
@@ -139,17 +512,22 @@ class Default(Konvalidator):
 	This validator never throws, always returns a value.
 	
 	'''
-	
+
+	__slots__ = ('default', 'validator')
+	interned = True
+
 	def __init__(self, validator, default):
 		self.default = default
 		self.validator = validator
 
 	def __call__(self, value):
-		try:
-			valid_value = self.validator(value)
+		ok, valid_value = attempt(self.validator, value)
+		if ok:
 			return valid_value
-		except KonvalError:
-			return self.default
+		return self.default
+
+	def attempt(self, value):
+		return True, self(value)
 
 class Constant(Konvalidator):
 	'''
@@ -157,12 +535,23 @@ class Constant(Konvalidator):
 
 	'''
 
+	__slots__ = ('constant_value',)
+	interned = True
+
 	def __init__(self, constant_value):
 		self.constant_value = constant_value
 	
 	def __call__(self, value):
 		return self.constant_value
 
+	def attempt(self, value):
+		return True, self.constant_value
+
+def _message(error):
+	if isinstance(error, KonvalError):
+		return error.message
+	return error
+
 class KonvalResult(object):
 
 	def __init__(self, schema):
@@ -170,24 +559,31 @@ class KonvalResult(object):
 		self.errors = {}
 		self.successes = {}
 
-	def add_error(self, name, message):
-		if name in self.schema.keys():
-			if name not in self.errors.keys():
+	def add_error(self, name, error):
+		'''
+		Record an error for a field, either a KonvalError or a message.
+
+		'''
+		if name in self.schema:
+			if name not in self.errors:
 				self.errors[name] = []
-			self.errors[name].append(message)
+			self.errors[name].append(error)
 
 	def add_success(self, name, value):
-		if name in self.schema.keys():
+		if name in self.schema:
 			self.successes[name] = value
 
 	def get_errors(self):
-		return dict((k, v) for k, v in self.errors.iteritems() if v != [])
+		return dict((k, [_message(e) for e in v]) for k, v in self.errors.iteritems() if v != [])
+
+	def get_error_codes(self):
+		return dict((k, [getattr(e, 'code', None) for e in v]) for k, v in self.errors.iteritems() if v != [])
 
 	def get_valid(self):
 		return dict((k, v) for k, v in self.successes.iteritems() if v is not None)
 
 	def is_valid(self):
-		return self.get_errors() == {}
+		return not any(self.errors.itervalues())
 
 	def get_value(self, name):
 		try:
@@ -195,28 +591,234 @@ class KonvalResult(object):
 		except KeyError:
 			return None
 
-def validate(schema, data):
-	result = KonvalResult(schema)
-	for name, value in data.iteritems():
-		if name in schema.keys():
-			validators = schema[name]
+def _validate_field(result, name, value, chain):
+	'''
+	Run the chain of one field on its value, recording the outcome in result.
+
+	Every validator sees the original value. The last to succeed supplies
+	the converted value, and every error is kept.
+
+	'''
+	for validator in chain:
+		try:
+			result.successes[name] = validator(value)
+		except KonvalError as e:
+			errors = result.errors
+			if name not in errors:
+				errors[name] = []
+			errors[name].append(e)
+
+class CompiledSchema(object):
+	'''
+	A schema prepared once for repeated validation.
 
+	Field names and validator chains are worked out at compile time, so
+	validating a record only walks the fields that record contains.
+
+	For fail-fast validation and check, calibrate can order fields and the
+	steps within each field by their measured cost and failure rate, so
+	that bad records are rejected as cheaply as possible.
+
+	'''
+
+	def __init__(self, schema):
+		self.schema = schema
+		self.chains = {}
+		self._steps = {}
+		for name, validators in schema.iteritems():
 			if type(validators) is not list:
 				validators = [validators]
-			for validator in validators:
+			self.chains[name] = tuple(validators)
+			self._steps[name] = tuple(range(len(validators)))
+		self.ordering = None
+
+	def __contains__(self, name):
+		return name in self.chains
+
+	def keys(self):
+		return self.chains.keys()
+
+	def validate(self, data, fail_fast=False):
+		'''
+		Validate a record, returning a KonvalResult.
+
+		With fail_fast, validation stops at the first error, and the result
+		holds only that error and the values converted before it.
+
+		'''
+		if fail_fast:
+			return self._validate_fail_fast(data)
+		result = KonvalResult(self.schema)
+		chains = self.chains
+		for name, value in data.iteritems():
+			chain = chains.get(name)
+			if chain is not None:
+				_validate_field(result, name, value, chain)
+		return result
+
+	def revalidate(self, previous, changes, removed=()):
+		'''
+		Update the result of a record after some of its fields changed.
+
+		changes maps the changed fields to their new values, and removed
+		names fields that were dropped. Only those fields are validated
+		again; the entries of every other field are left as they are. As
+		each chain only sees its own field, the result is the same as for
+		validating the whole updated record. previous is updated in place
+		and returned.
+
+		'''
+		errors = previous.errors
+		successes = previous.successes
+		chains = self.chains
+		for name in removed:
+			errors.pop(name, None)
+			successes.pop(name, None)
+		for name, value in changes.iteritems():
+			chain = chains.get(name)
+			if chain is None:
+				continue
+			errors.pop(name, None)
+			successes.pop(name, None)
+			_validate_field(previous, name, value, chain)
+		return previous
+
+	def _plan(self, data):
+		if self.ordering is None:
+			steps = self._steps
+			return ((name, steps[name]) for name in data if name in steps)
+		return ((name, indices) for name, indices in self.ordering if name in data)
+
+	def _validate_fail_fast(self, data):
+		result = KonvalResult(self.schema)
+		chains = self.chains
+		for name, indices in self._plan(data):
+			chain = chains[name]
+			value = data[name]
+			# as in a full run, the last step in declared order supplies the value
+			last = -1
+			for index in indices:
 				try:
-					processed_value = validator(value)
-					result.add_success(name, processed_value)
+					converted = chain[index](value)
 				except KonvalError as e:
-					result.add_error(name, e.message)
-	return result
+					result.errors[name] = [e]
+					return result
+				if index > last:
+					last = index
+					result.successes[name] = converted
+		return result
+
+	def check(self, data):
+		'''
+		Return whether a record is valid, stopping at the first failure.
 
-def quick(validator, value):
-	try:
-		validator(value)
+		No exceptions are raised or results built along the way.
+
+		'''
+		chains = self.chains
+		for name, indices in self._plan(data):
+			chain = chains[name]
+			value = data[name]
+			for index in indices:
+				if not attempt(chain[index], value)[0]:
+					return False
 		return True
-	except KonvalError:
-		return False
+
+	def calibrate(self, records):
+		'''
+		Order fail-fast evaluation by cost and failure rate on sample records.
+
+		Each step of each field is timed on the sample. Steps within a field,
+		and then fields, are ordered so that cheap checks that often fail run
+		first. Fields not seen in the sample go last. Returns the ordering, a
+		list of (field name, step indices), which can also be assigned
+		directly. Set it to None to go back to the record's own order.
+
+		'''
+		timer = timeit.default_timer
+		measured = {}
+		for record in records:
+			for name, value in record.iteritems():
+				chain = self.chains.get(name)
+				if chain is None:
+					continue
+				for index, validator in enumerate(chain):
+					start = timer()
+					ok = attempt(validator, value)[0]
+					elapsed = timer() - start
+					totals = measured.setdefault((name, index), [0, 0, 0.0])
+					totals[0] += 1
+					totals[1] += not ok
+					totals[2] += elapsed
+
+		fields = []
+		for name, chain in self.chains.iteritems():
+			steps = []
+			for index in range(len(chain)):
+				calls, fails, elapsed = measured.get((name, index), (0, 0, 0.0))
+				if calls:
+					steps.append((_rank(elapsed / calls, float(fails) / calls), index, elapsed / calls, float(fails) / calls))
+				else:
+					steps.append(((float('inf'), float('inf')), index, 0.0, 0.0))
+			steps.sort()
+			cost = sum(step[2] for step in steps)
+			passes = 1.0
+			for step in steps:
+				passes *= 1.0 - step[3]
+			seen = any((name, index) in measured for index in range(len(chain)))
+			rank = _rank(cost, 1.0 - passes) if seen else (float('inf'), float('inf'))
+			fields.append((rank, name, tuple(step[1] for step in steps)))
+		fields.sort(key=lambda field: field[0])
+		self.ordering = [(name, indices) for _, name, indices in fields]
+		return self.ordering
+
+def compile(schema):
+	'''
+	Prepare a schema for repeated use with validate.
+
+	'''
+	if isinstance(schema, CompiledSchema):
+		return schema
+	return CompiledSchema(schema)
+
+def validate(schema, data, fail_fast=False):
+	return compile(schema).validate(data, fail_fast)
+
+def revalidate(schema, previous, changes, removed=()):
+	return compile(schema).revalidate(previous, changes, removed)
+
+def validate_async(schema, data, max_concurrency=8, timeout=None, pool=None):
+	'''
+	Validate a record, running fields with I/O-bound validators concurrently.
+
+	See konval.parallel.validate_async.
+
+	'''
+	from . import parallel
+	return parallel.validate_async(schema, data, max_concurrency, timeout, pool)
+
+def validate_many(schema, records, failures_only=False, max_errors=None):
+	'''
+	Lazily validate an iterable of records, yielding a result for each.
+
+	If failures_only is set, only results for invalid records are yielded.
+	If max_errors is given, iteration stops after that many invalid records.
+
+	'''
+	compiled = compile(schema)
+	error_count = 0
+	for record in records:
+		result = compiled.validate(record)
+		if result.errors:
+			error_count += 1
+		elif failures_only:
+			continue
+		yield result
+		if max_errors is not None and error_count >= max_errors:
+			return
+
+def quick(validator, value):
+	return attempt(validator, value)[0]
 
 def once(validator, value):
 	try:
@@ -225,7 +827,48 @@ def once(validator, value):
 		return e.message
 
 
-class KonvalError(Exception): pass
+class KonvalError(Exception):
+	'''
+	The base class for validation and conversion failures.
+
+	Errors carry a code, the failing validator and the offending value
+	alongside the message. The message is only formatted when it is read:
+	positional params are interpolated with %, a fields dict with
+	str.format. Failures that are caught and discarded never render.
+
+	'''
+
+	def __init__(self, message='', *params, **kwargs):
+		Exception.__init__(self, message, *params)
+		self.template = message
+		self.params = params
+		self.fields = kwargs.get('fields')
+		self.code = kwargs.get('code')
+		self.validator = kwargs.get('validator')
+		self.value = kwargs.get('value')
+		self._message = None
+
+	@property
+	def message(self):
+		if self._message is None:
+			if self.fields is not None:
+				self._message = self.template.format(**self.fields)
+			elif self.params:
+				self._message = self.template % self.params
+			else:
+				self._message = self.template
+		return self._message
+
+	def __str__(self):
+		return str(self.message)
+
+	def __unicode__(self):
+		return unicode(self.message)
+
+	def __reduce__(self):
+		# the validator is left behind when errors cross process boundaries
+		state = dict(self.__dict__, validator=None)
+		return (self.__class__, self.args, state)
 
 class ValidationError(KonvalError): pass
 
@@ -0,0 +1,185 @@
+import collections
+import threading
+
+from . import FAILED, Konvalidator, KonvalError
+
+
+class _LRUCache(object):
+	'''
+	Evicts the least recently used entry.
+
+	'''
+
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.entries = collections.OrderedDict()
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key):
+		outcome = self.entries.pop(key, None)
+		if outcome is not None:
+			self.entries[key] = outcome
+		return outcome
+
+	def put(self, key, outcome):
+		if self.maxsize <= 0 or key in self.entries:
+			return 0
+		evicted = 0
+		if len(self.entries) >= self.maxsize:
+			self.entries.popitem(last=False)
+			evicted = 1
+		self.entries[key] = outcome
+		return evicted
+
+
+class _LFUCache(object):
+	'''
+	Evicts the least frequently used entry, oldest first among ties.
+
+	Keys are kept in one bucket per use count, so both lookups and
+	evictions take constant time.
+
+	'''
+
+	def __init__(self, maxsize):
+		self.maxsize = maxsize
+		self.entries = {}
+		self.buckets = {}
+		self.min_count = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def get(self, key):
+		entry = self.entries.get(key)
+		if entry is None:
+			return None
+		count = entry[1]
+		bucket = self.buckets[count]
+		del bucket[key]
+		if not bucket:
+			del self.buckets[count]
+			if self.min_count == count:
+				self.min_count = count + 1
+		entry[1] = count + 1
+		self.buckets.setdefault(count + 1, collections.OrderedDict())[key] = None
+		return entry[0]
+
+	def put(self, key, outcome):
+		if self.maxsize <= 0 or key in self.entries:
+			return 0
+		evicted = 0
+		if len(self.entries) >= self.maxsize:
+			bucket = self.buckets[self.min_count]
+			old_key = bucket.popitem(last=False)[0]
+			if not bucket:
+				del self.buckets[self.min_count]
+			del self.entries[old_key]
+			evicted = 1
+		self.entries[key] = [outcome, 1]
+		self.buckets.setdefault(1, collections.OrderedDict())[key] = None
+		self.min_count = 1
+		return evicted
+
+
+POLICIES = {
+	'lru': _LRUCache,
+	'lfu': _LFUCache,
+}
+
+
+def _run(validator, value):
+	try:
+		return True, validator(value)
+	except KonvalError as e:
+		return False, e
+
+
+class Cached(Konvalidator):
+	'''
+	Remember the outcome of a deterministic validator for repeated values.
+
+	Successful conversions and failures are both cached, keyed on the value
+	and its type, so a repeated value skips the wrapped validator entirely.
+	Once maxsize entries are held, the least recently used entry is evicted,
+	or the least frequently used with policy='lfu'. Unhashable values are
+	passed straight through. Only wrap validators that are pure.
+
+	'''
+
+	def __init__(self, validator, maxsize=1024, policy='lru'):
+		if policy not in POLICIES:
+			raise ValueError('Unknown cache policy %r' % policy)
+		self.validator = validator
+		self.maxsize = maxsize
+		self.policy = policy
+		self.clear()
+
+	def __call__(self, value):
+		ok, result = self._outcome(value)
+		if ok:
+			return result
+		raise result
+
+	def attempt(self, value):
+		ok, result = self._outcome(value)
+		if ok:
+			return True, result
+		return FAILED
+
+	def _outcome(self, value):
+		key = (value.__class__, value)
+		try:
+			with self._lock:
+				outcome = self._cache.get(key)
+				if outcome is not None:
+					self.hits += 1
+		except TypeError:
+			return _run(self.validator, value)
+		if outcome is not None:
+			return outcome
+		outcome = _run(self.validator, value)
+		with self._lock:
+			self.misses += 1
+			self.evictions += self._cache.put(key, outcome)
+		return outcome
+
+	def clear(self):
+		'''
+		Empty the cache and reset the statistics.
+
+		'''
+		self._cache = POLICIES[self.policy](self.maxsize)
+		self._lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def stats(self):
+		return {
+			'hits': self.hits,
+			'misses': self.misses,
+			'evictions': self.evictions,
+			'size': len(self._cache),
+			'maxsize': self.maxsize,
+		}
+
+	def __reduce__(self):
+		# copies start with an empty cache
+		return (self.__class__, (self.validator, self.maxsize, self.policy))
+
+
+def cache_schema(schema, maxsize=1024, policy='lru'):
+	'''
+	Return a copy of a schema with every validator wrapped in Cached.
+
+	'''
+	cached = {}
+	for name, validators in schema.iteritems():
+		if type(validators) is list:
+			cached[name] = [Cached(v, maxsize, policy) for v in validators]
+		else:
+			cached[name] = Cached(validators, maxsize, policy)
+	return cached
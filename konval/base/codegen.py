@@ -0,0 +1,313 @@
+'''
+Generate specialized Python code for a schema.
+
+Interpreting a schema dispatches through several methods per validator
+per value. generate_schema turns a schema into one Python function with
+the checks of the built-in validators written out inline: comparisons,
+length checks, type tests, vocabulary lookups and pre-bound regex match
+methods, threaded through And, Or and Default. Any other validator is
+called through its attempt method. The generated function only decides
+whether each field passes. When a field fails, its chain is run again
+through the validators themselves, so errors and results are exactly
+those of CompiledSchema.validate.
+
+The generated code depends only on the shape of the schema (field names,
+which validators are where), not on their settings, which are read from
+the validators when the code is loaded. Modules are cached on disk keyed
+by a fingerprint of that shape, so a warm start neither generates nor
+compiles anything.
+
+'''
+
+import functools
+import hashlib
+import imp
+import os
+import tempfile
+
+from . import And, CompiledSchema, Default, KonvalResult, Or, _validate_field, attempt
+from . import numbers, strings, types, vocabulary
+
+# bump when the generated code changes, to retire old cache entries
+_FORMAT = 2
+
+_MISSING = object()
+
+# (class, kind) for validators whose attempt is written out inline
+_INLINE = [
+	(numbers.Range, 'range'),
+	(numbers.Between, 'between'),
+	(numbers.IsEqual, 'equal'),
+	(strings.LengthBetween, 'length_between'),
+	(strings.LengthRange, 'length'),
+	(strings.IsRegexMatch, 'regex'),
+	(types.IsType, 'is_type'),
+	(types.IsInstance, 'is_instance'),
+	(types.ToType, 'to_type'),
+	(vocabulary.InList, 'in_list'),
+	(And, 'and'),
+	(Or, 'or'),
+	(Default, 'default'),
+]
+
+
+def default_cache_dir():
+	'''
+	The directory for generated modules: $KONVAL_CACHE_DIR or ~/.cache/konval.
+
+	'''
+	return os.environ.get('KONVAL_CACHE_DIR') or os.path.join(os.path.expanduser('~'), '.cache', 'konval')
+
+
+def _kind(validator):
+	attempt_method = getattr(type(validator), 'attempt', None)
+	function = getattr(attempt_method, '__func__', None)
+	for cls, kind in _INLINE:
+		if isinstance(validator, cls) and function is cls.__dict__['attempt']:
+			if kind in ('and', 'or') and (validator.adaptive is not None or not validator.validators):
+				return 'call'
+			return kind
+	return 'call'
+
+
+def _children(validator, kind):
+	if kind in ('and', 'or'):
+		return [('%s.validators[%d]' % ('%s', i), child) for i, child in enumerate(validator.validators)]
+	if kind == 'default':
+		return [('%s.validator', validator.validator)]
+	return []
+
+
+def _shape(validator):
+	kind = _kind(validator)
+	return (kind,) + tuple(_shape(child) for _, child in _children(validator, kind))
+
+
+def _chains(schema):
+	if isinstance(schema, CompiledSchema):
+		return schema.chains
+	return CompiledSchema(schema).chains
+
+
+def _field_names(chains):
+	for name in chains:
+		if not isinstance(name, (basestring, int, long)):
+			raise ValueError('Cannot generate code for field name %r' % (name,))
+	return sorted(chains, key=repr)
+
+
+def fingerprint(schema):
+	'''
+	Return a hex digest identifying the code generated for a schema.
+
+	'''
+	chains = _chains(schema)
+	shape = [(repr(name), tuple(_shape(v) for v in chains[name])) for name in _field_names(chains)]
+	return hashlib.sha1(repr((_FORMAT, shape))).hexdigest()
+
+
+class _Generator(object):
+
+	def __init__(self):
+		self.bindings = []
+		self.lines = []
+		self.count = 0
+
+	def name(self, prefix):
+		self.count += 1
+		return '%s%d' % (prefix, self.count)
+
+	def bind(self, expression):
+		name = self.name('_k')
+		self.bindings.append('%s = %s' % (name, expression))
+		return name
+
+	def line(self, indent, text):
+		self.lines.append('\t' * indent + text)
+
+	def emit(self, validator, path, source, indent):
+		'''
+		Write out the attempt of validator on the variable source.
+
+		Returns the variable holding the converted value. On failure the
+		code breaks out of the innermost enclosing loop.
+
+		'''
+		kind = _kind(validator)
+		line = self.line
+		if kind in ('range', 'between', 'length', 'length_between'):
+			low = self.bind(path + '.minimum')
+			high = self.bind(path + '.maximum')
+			measure = 'len(%s)' % source if kind.startswith('length') else source
+			below, above = ('<', '>') if kind in ('range', 'length') else ('<=', '>=')
+			line(indent, 'if %s and %s %s %s: break' % (low, measure, below, low))
+			line(indent, 'if %s and %s %s %s: break' % (high, measure, above, high))
+			if not kind.startswith('length'):
+				# NaN fails a bounded range, as in Range and Between
+				line(indent, 'if (%s or %s) and %s != %s: break' % (low, high, measure, measure))
+			return source
+		if kind == 'equal':
+			line(indent, 'if %s != %s: break' % (source, self.bind(path + '.equal')))
+			return source
+		if kind == 'regex':
+			match = self.bind(path + '.re.match')
+			line(indent, 'if not %s(%s.tobytes() if %s.__class__ is memoryview else %s): break'
+				% (match, source, source, source))
+			return source
+		if kind == 'is_type':
+			line(indent, 'if type(%s) not in %s: break' % (source, self.bind(path + '.allowed_classes')))
+			return source
+		if kind == 'is_instance':
+			line(indent, 'if not isinstance(%s, %s): break' % (source, self.bind(path + '.allowed_classes')))
+			return source
+		if kind == 'in_list':
+			line(indent, 'if %s not in %s: break' % (source, self.bind(path + '.term_list')))
+			return source
+		if kind == 'to_type':
+			to_type = self.bind(path + '.to_type')
+			out = self.name('_v')
+			line(indent, 'try:')
+			line(indent + 1, '%s = %s(%s)' % (out, to_type, source))
+			line(indent, 'except:')
+			line(indent + 1, 'break')
+			return out
+		if kind == 'and':
+			for child_path, child in _children(validator, kind):
+				source = self.emit(child, child_path % path, source, indent)
+			return source
+		if kind == 'or':
+			ok = self.name('_ok')
+			out = self.name('_v')
+			line(indent, '%s = False' % ok)
+			for i, (child_path, child) in enumerate(_children(validator, kind)):
+				inner = indent
+				if i:
+					line(indent, 'if not %s:' % ok)
+					inner += 1
+				line(inner, 'while 1:')
+				result = self.emit(child, child_path % path, source, inner + 1)
+				line(inner + 1, '%s = %s' % (out, result))
+				line(inner + 1, '%s = True' % ok)
+				line(inner + 1, 'break')
+			line(indent, 'if not %s: break' % ok)
+			return out
+		if kind == 'default':
+			out = self.name('_v')
+			line(indent, '%s = %s' % (out, self.bind(path + '.default')))
+			line(indent, 'while 1:')
+			child_path, child = _children(validator, kind)[0]
+			result = self.emit(child, child_path % path, source, indent + 1)
+			line(indent + 1, '%s = %s' % (out, result))
+			line(indent + 1, 'break')
+			return out
+		ok = self.name('_ok')
+		out = self.name('_v')
+		line(indent, '%s, %s = %s(%s)' % (ok, out, self.bind('_attempt_of(%s)' % path), source))
+		line(indent, 'if not %s: break' % ok)
+		return out
+
+
+def generate(schema):
+	'''
+	Return the source of a module for a schema.
+
+	The module defines build(chains, ...), which binds the settings of the
+	validators in the compiled chains and returns the validate function.
+
+	'''
+	chains = _chains(schema)
+	generator = _Generator()
+	line = generator.line
+	for name in _field_names(chains):
+		key = repr(name)
+		line(1, 'value = get(%s, _MISSING)' % key)
+		line(1, 'if value is not _MISSING:')
+		line(2, 'ok = False')
+		line(2, 'while 1:')
+		out = 'value'
+		for i, validator in enumerate(chains[name]):
+			out = generator.emit(validator, 'chains[%s][%d]' % (key, i), 'value', 3)
+		line(3, 'successes[%s] = %s' % (key, out))
+		line(3, 'ok = True')
+		line(3, 'break')
+		line(2, 'if not ok:')
+		line(3, '_fallback(result, %s, value, chains[%s])' % (key, key))
+
+	source = ['# Generated by konval.codegen, fingerprint %s' % fingerprint(chains), '',
+		'def build(chains, schema, KonvalResult, _fallback, _attempt_of, _MISSING):']
+	source.extend('\t' + binding for binding in generator.bindings)
+	source.extend(['', '\tdef validate(data):',
+		'\t\tresult = KonvalResult(schema)',
+		'\t\tsuccesses = result.successes',
+		'\t\tget = data.get'])
+	source.extend('\t' + text for text in generator.lines)
+	source.extend(['\t\treturn result', '', '\treturn validate', ''])
+	return '\n'.join(source)
+
+
+def _attempt_of(validator):
+	validator_attempt = getattr(validator, 'attempt', None)
+	if validator_attempt is not None:
+		return validator_attempt
+	return functools.partial(attempt, validator)
+
+
+def _load_module(schema, cache_dir):
+	key = fingerprint(schema)
+	module_name = 'konval_schema_' + key
+	if cache_dir:
+		path = os.path.join(cache_dir, module_name + '.py')
+		if not os.path.exists(path):
+			source = generate(schema)
+			try:
+				if not os.path.isdir(cache_dir):
+					os.makedirs(cache_dir)
+				handle, temporary = tempfile.mkstemp(dir=cache_dir, prefix='.' + module_name)
+				with os.fdopen(handle, 'w') as out:
+					out.write(source)
+				os.rename(temporary, path)
+			except (IOError, OSError):
+				path = None
+		if path is not None:
+			# load_source keeps the compiled bytecode alongside, for the next start
+			return imp.load_source(module_name, path)
+	module = imp.new_module(module_name)
+	exec compile(generate(schema), '<%s>' % module_name, 'exec') in module.__dict__
+	return module
+
+
+class GeneratedSchema(CompiledSchema):
+	'''
+	A compiled schema that validates records with generated code.
+
+	Results are the same as for CompiledSchema. Generated modules are
+	cached in cache_dir (default_cache_dir() unless given), or kept only in
+	memory if cache_dir is False or the directory can't be written. Fail-fast
+	validation and check use the interpreted validators, and the profiler
+	does not see into generated code.
+
+	'''
+
+	def __init__(self, schema, cache_dir=None):
+		if isinstance(schema, CompiledSchema):
+			schema = schema.schema
+		super(GeneratedSchema, self).__init__(schema)
+		if cache_dir is None:
+			cache_dir = default_cache_dir()
+		module = _load_module(self, cache_dir)
+		self.source_path = getattr(module, '__file__', None)
+		# a rejected field is run again as in CompiledSchema.validate
+		self._generated = module.build(self.chains, self.schema, KonvalResult, _validate_field, _attempt_of, _MISSING)
+
+	def validate(self, data, fail_fast=False):
+		if fail_fast:
+			return self._validate_fail_fast(data)
+		return self._generated(data)
+
+
+def generate_schema(schema, cache_dir=None):
+	'''
+	Prepare a schema for repeated use with generated code.
+
+	'''
+	return GeneratedSchema(schema, cache_dir)
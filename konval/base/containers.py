@@ -1,4 +1,7 @@
-from . import Konvalidator, KonversionError, ValidationError
+import collections
+import itertools
+
+from . import FAILED, Konvalidator, KonvalError, KonversionError, ValidationError, attempt
 
 
 class ToLength(Konvalidator):
@@ -8,7 +11,10 @@ class ToLength(Konvalidator):
 	-- Note: int is cast to unicode
 	
 	'''
-	
+
+	__slots__ = ()
+	interned = True
+
 	def convert_value(self, value):
 		try:
 			length = len(value)
@@ -17,59 +23,324 @@ class ToLength(Konvalidator):
 			if isinstance(value, int):
 				return self.convert_value(unicode(value))
 
-		raise KonversionError('Could not get length of %s.' % repr(value))
+		raise KonversionError('Could not get length of %r.', value, code='no_length', validator=self, value=value)
+
+	def attempt(self, value):
+		try:
+			return True, len(value)
+		except TypeError:
+			if isinstance(value, int):
+				return True, len(unicode(value))
+		return FAILED
+
+_to_length = ToLength()
+
+
+def _is_lazy(value):
+	# generators and other iterators can be counted only by consuming them
+	return not hasattr(value, '__len__') and hasattr(value, '__iter__')
 
 
 class LengthRange(Konvalidator):
 	'''
 	Only allow values of a certain sizes.
 
-	Will work on most data types.
+	Will work on most data types. Lazy iterables, such as generators, are
+	counted only as far as maximum + 1 items (or minimum, without a
+	maximum). A lazy value is returned as a list once it has been read to
+	the end, or else as an iterator over the items read and the rest.
 	
 	'''
 
+	__slots__ = ('minimum', 'maximum')
+	interned = True
+
 	def __init__ (self, minimum=None, maximum=None):
 		self.minimum = minimum
 		self.maximum = maximum
 
-	def validate_value(self, value):
-		length = ToLength().convert(value)
-		
+	def __call__(self, value):
+		if _is_lazy(value):
+			length, value = self._count(value)
+			self._check_length(value, length)
+			return value
+		return Konvalidator.__call__(self, value)
+
+	def _count(self, value):
+		limit = self.maximum + 1 if self.maximum else self.minimum
+		if not limit:
+			return None, value
+		items = iter(value)
+		head = list(itertools.islice(items, limit))
+		if len(head) < limit:
+			return len(head), head
+		return len(head), itertools.chain(head, items)
+
+	def _check_length(self, value, length):
+		if length is None:
+			return
 		if self.minimum and length < self.minimum:
-			raise ValidationError('The value %s is less than the required minimum: %s' % (value, self.minimum))
+			raise ValidationError('The value %s is less than the required minimum: %s', value, self.minimum, code='too_short', validator=self, value=value)
 		if self.maximum and length > self.maximum:
-			raise ValidationError('The value %s is greater than the required maximum: %s' % (value, self.maximum))
-		
+			raise ValidationError('The value %s is greater than the required maximum: %s', value, self.maximum, code='too_long', validator=self, value=value)
+
+	def validate_value(self, value):
+		self._check_length(value, _to_length.convert(value))
 		return True
 
+	def attempt(self, value):
+		if _is_lazy(value):
+			length, value = self._count(value)
+			if length is None:
+				return True, value
+		else:
+			ok, length = _to_length.attempt(value)
+			if not ok:
+				return FAILED
+		if self.minimum and length < self.minimum:
+			return FAILED
+		if self.maximum and length > self.maximum:
+			return FAILED
+		return True, value
+
 
 class IsEmpty(Konvalidator):
 	'''
 	Checks the value is empty (an empty string, list, etc.)
 
-	Uses LengthRange to determine emptiness.
+	Uses ToLength to determine emptiness.
 
 	This method will not count a string '  ' as empty. Use the string validator IsEmpty for that.
 	
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def validate_value(self, value):
-		try:
-			return LengthRange(max=0).validate(value)
-		except ValidationError:
-			raise ValidationError('The value "%s" is not empty.' % repr(value))
+		if _to_length.convert(value) > 0:
+			raise ValidationError('The value "%r" is not empty.', value, code='not_empty', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		ok, length = _to_length.attempt(value)
+		if ok and length <= 0:
+			return True, value
+		return FAILED
 
 
 class IsNotEmpty(Konvalidator):
 	'''
 	Checks the value is not empty (a nonblank string, list with items, etc.)
 	
-	Uses LengthRange to determine non-emptiness
+	Uses ToLength to determine non-emptiness
 	
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def validate_value(self, value):
+		if _to_length.convert(value) < 1:
+			raise ValidationError('The value "%r" is empty.', value, code='empty', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		ok, length = _to_length.attempt(value)
+		if ok and length >= 1:
+			return True, value
+		return FAILED
+
+
+def _item_error(validator, value, item_errors):
+	keys = item_errors.keys()
+	first = keys[0]
+	if len(keys) == 1:
+		error = ValidationError('Item %r is invalid: %s', first, item_errors[first],
+			code='bad_item', validator=validator, value=value)
+	else:
+		error = ValidationError('%d items are invalid, the first %r: %s', len(keys), first, item_errors[first],
+			code='bad_item', validator=validator, value=value)
+	error.indices = keys
+	error.item_errors = item_errors
+	return error
+
+
+class EachItem(Konvalidator):
+	'''
+	Validate every item of any iterable, one at a time.
+
+	Items are pulled lazily, so generators and other streams are never held
+	in memory as a whole. By default the first bad item fails the value.
+	With fail_fast=False every item is checked, and the error lists the
+	indices of all the bad ones (as error.indices, with their errors in
+	error.item_errors). Returns a list of the converted items, or with
+	convert=False the value itself, so that nothing is kept.
+
+	'''
+
+	__slots__ = ('validator', 'fail_fast', 'convert')
+	interned = True
+
+	minimum = None
+	maximum = None
+
+	def __init__(self, validator, fail_fast=True, convert=True):
+		self.validator = validator
+		self.fail_fast = fail_fast
+		self.convert = convert
+
+	def __call__(self, value):
+		try:
+			items = iter(value)
+		except TypeError:
+			raise ValidationError('The value %r is not iterable.', value, code='not_iterable', validator=self, value=value)
+		validator = self.validator
+		maximum = self.maximum
+		converted = [] if self.convert else None
+		item_errors = None
+		count = 0
+		for index, item in enumerate(items):
+			count = index + 1
+			if maximum is not None and count > maximum:
+				raise ValidationError('The value has more than the maximum of %s items.', maximum,
+					code='too_long', validator=self, value=value)
+			try:
+				item = validator(item)
+			except KonvalError as e:
+				if item_errors is None:
+					item_errors = collections.OrderedDict()
+				item_errors[index] = e
+				if self.fail_fast:
+					break
+				continue
+			if converted is not None and item_errors is None:
+				converted.append(item)
+		if item_errors:
+			raise _item_error(self, value, item_errors)
+		if self.minimum is not None and count < self.minimum:
+			raise ValidationError('The value has fewer than the minimum of %s items.', self.minimum,
+				code='too_short', validator=self, value=value)
+		return value if converted is None else converted
+
+	def attempt(self, value):
+		try:
+			items = iter(value)
+		except TypeError:
+			return FAILED
+		validator = self.validator
+		maximum = self.maximum
+		converted = [] if self.convert else None
+		count = 0
+		for item in items:
+			count += 1
+			if maximum is not None and count > maximum:
+				return FAILED
+			ok, item = attempt(validator, item)
+			if not ok:
+				return FAILED
+			if converted is not None:
+				converted.append(item)
+		if self.minimum is not None and count < self.minimum:
+			return FAILED
+		return True, value if converted is None else converted
+
+
+class ListOf(EachItem):
+	'''
+	Validate the items of any iterable, and how many there are, as a list.
+
+	Like EachItem, but also counts the items as they are read, failing as
+	soon as there are more than maximum.
+
+	'''
+
+	__slots__ = ('minimum', 'maximum')
+	interned = True
+
+	def __init__(self, validator, minimum=None, maximum=None, fail_fast=True):
+		super(ListOf, self).__init__(validator, fail_fast)
+		self.minimum = minimum
+		self.maximum = maximum
+
+
+class DictOf(Konvalidator):
+	'''
+	Validate the keys and values of a mapping, or of any iterable of pairs.
+
+	Pairs are read lazily and a dict of the converted keys and values is
+	returned. Either validator may be None to leave keys or values as they
+	are. Bad items are reported by key (or position, if not a pair), as for
+	EachItem.
+
+	'''
+
+	__slots__ = ('key_validator', 'value_validator', 'fail_fast')
+	interned = True
+
+	def __init__(self, key_validator=None, value_validator=None, fail_fast=True):
+		self.key_validator = key_validator
+		self.value_validator = value_validator
+		self.fail_fast = fail_fast
+
+	def _pairs(self, value):
+		if hasattr(value, 'iteritems'):
+			return value.iteritems()
+		return iter(value)
+
+	def __call__(self, value):
+		try:
+			pairs = self._pairs(value)
+		except TypeError:
+			raise ValidationError('The value %r is not a mapping.', value, code='not_iterable', validator=self, value=value)
+		key_validator = self.key_validator
+		value_validator = self.value_validator
+		converted = {}
+		item_errors = None
+		for index, pair in enumerate(pairs):
+			label = index
+			try:
+				try:
+					key, item = pair
+				except (TypeError, ValueError):
+					raise ValidationError('Item %r is not a key, value pair.', pair, code='not_pair', validator=self, value=pair)
+				label = key
+				if key_validator is not None:
+					key = key_validator(key)
+				if value_validator is not None:
+					item = value_validator(item)
+			except KonvalError as e:
+				if item_errors is None:
+					item_errors = collections.OrderedDict()
+				item_errors[label] = e
+				if self.fail_fast:
+					break
+				continue
+			converted[key] = item
+		if item_errors:
+			raise _item_error(self, value, item_errors)
+		return converted
+
+	def attempt(self, value):
 		try:
-			return LengthRange(min=1).validate(value)
-		except ValidationError:
-			raise ValidationError('The value "%s" is empty.' % repr(value))
\ No newline at end of file
+			pairs = self._pairs(value)
+		except TypeError:
+			return FAILED
+		key_validator = self.key_validator
+		value_validator = self.value_validator
+		converted = {}
+		for pair in pairs:
+			try:
+				key, item = pair
+			except (TypeError, ValueError):
+				return FAILED
+			if key_validator is not None:
+				ok, key = attempt(key_validator, key)
+				if not ok:
+					return FAILED
+			if value_validator is not None:
+				ok, item = attempt(value_validator, item)
+				if not ok:
+					return FAILED
+			converted[key] = item
+		return True, converted
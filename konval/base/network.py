@@ -0,0 +1,345 @@
+'''
+IP address and network validators.
+
+Addresses are parsed in a single pass, by the same rules as the ipaddress
+module, straight to an integer, rather than checked against a pattern and
+then parsed again. No ipaddress object is built unless a converter asks
+for one. Text, bytes, bytearray and memoryview values are all accepted.
+
+'''
+
+import re
+
+from . import FAILED, Konvalidator, ValidationError
+
+_DIGITS = frozenset('0123456789')
+_HEX_DIGITS = frozenset('0123456789ABCDEFabcdef')
+_IPV6_HEXTETS = 8
+
+
+def _text(value):
+	if isinstance(value, basestring):
+		return value
+	if value.__class__ is memoryview:
+		return value.tobytes()
+	if value.__class__ is bytearray:
+		return str(value)
+	return None
+
+
+_ipv4_match = None
+
+def _compile_ipv4():
+	global _ipv4_match
+	_ipv4_match = re.compile(r'([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\.([0-9]{1,3})\Z').match
+	return _ipv4_match
+
+
+def parse_ipv4(text):
+	'''
+	Return a dotted-quad IPv4 address as an integer, or None if it is invalid.
+
+	'''
+	# one match splits and checks the octets, compiled on first use
+	match = (_ipv4_match or _compile_ipv4())(text)
+	if match is None:
+		return None
+	octets = match.groups()
+	a, b, c, d = octets
+	a = int(a)
+	b = int(b)
+	c = int(c)
+	d = int(d)
+	if a > 255 or b > 255 or c > 255 or d > 255:
+		return None
+	for octet in octets:
+		# as in ipaddress, a leading zero on an octet above 7 is ambiguous (octal or decimal)
+		if octet[0] == '0' and int(octet) > 7:
+			return None
+	return (a << 24) | (b << 16) | (c << 8) | d
+
+
+def _hextet(text):
+	if not 0 < len(text) <= 4 or not _HEX_DIGITS.issuperset(text):
+		return None
+	return int(text, 16)
+
+
+def parse_ipv6(text):
+	'''
+	Return an IPv6 address as an integer, or None if it is invalid.
+
+	'''
+	parts = text.split(':')
+	if len(parts) < 3:
+		return None
+	if '.' in parts[-1]:
+		ipv4 = parse_ipv4(parts.pop())
+		if ipv4 is None:
+			return None
+		parts.append('%x' % (ipv4 >> 16))
+		parts.append('%x' % (ipv4 & 0xFFFF))
+	if len(parts) > _IPV6_HEXTETS + 1:
+		return None
+
+	skip_index = None
+	for i in xrange(1, len(parts) - 1):
+		if not parts[i]:
+			if skip_index is not None:
+				return None
+			skip_index = i
+	if skip_index is not None:
+		parts_hi = skip_index
+		parts_lo = len(parts) - skip_index - 1
+		if not parts[0]:
+			parts_hi -= 1
+			if parts_hi:
+				return None
+		if not parts[-1]:
+			parts_lo -= 1
+			if parts_lo:
+				return None
+		parts_skipped = _IPV6_HEXTETS - (parts_hi + parts_lo)
+		if parts_skipped < 1:
+			return None
+	else:
+		if len(parts) != _IPV6_HEXTETS:
+			return None
+		parts_hi = len(parts)
+		parts_lo = 0
+		parts_skipped = 0
+
+	ip = 0
+	for i in xrange(parts_hi):
+		hextet = _hextet(parts[i])
+		if hextet is None:
+			return None
+		ip = (ip << 16) | hextet
+	ip <<= 16 * parts_skipped
+	for i in xrange(-parts_lo, 0):
+		hextet = _hextet(parts[i])
+		if hextet is None:
+			return None
+		ip = (ip << 16) | hextet
+	return ip
+
+
+class _AddressValidator(Konvalidator):
+	'''
+	Parses a value once, failing if the address is invalid.
+
+	Subclasses set parse and kind, and may override _convert.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	parse = None
+	kind = None
+
+	def _convert(self, value, ip):
+		return value
+
+	def _fail(self, value):
+		return ValidationError('The value %r is not a valid %s.', value, self.kind, code='not_ip_address', validator=self, value=value)
+
+	def __call__(self, value):
+		text = _text(value)
+		ip = None if text is None else self.parse(text)
+		if ip is None:
+			raise self._fail(value)
+		return self._convert(value, ip)
+
+	def validate_value(self, value):
+		self(value)
+		return True
+
+	def attempt(self, value):
+		text = _text(value)
+		ip = None if text is None else self.parse(text)
+		if ip is None:
+			return FAILED
+		return True, self._convert(value, ip)
+
+	def _pack(self, values):
+		parse = self.parse
+		ips = []
+		valid = []
+		for value in values:
+			text = _text(value)
+			ip = None if text is None else parse(text)
+			valid.append(ip is not None)
+			ips.append(ip or 0)
+		return ips, valid
+
+
+class IsIpv4Address(_AddressValidator):
+	'''
+	Only allow dotted-quad IPv4 addresses, returning them unchanged.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	parse = staticmethod(parse_ipv4)
+	kind = 'IPv4 address'
+
+	def pack(self, values):
+		'''
+		Validate a column of addresses at once.
+
+		Returns a NumPy uint32 array of the addresses, with 0 for invalid
+		ones, and a boolean array that is True where an address is valid.
+
+		'''
+		import numpy
+		ips, valid = self._pack(values)
+		return numpy.array(ips, dtype=numpy.uint32), numpy.array(valid, dtype=bool)
+
+
+class IsIpv6Address(_AddressValidator):
+	'''
+	Only allow IPv6 addresses, returning them unchanged.
+
+	As in the ipaddress module, zone indexes (fe80::1%eth0) are not allowed.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	parse = staticmethod(parse_ipv6)
+	kind = 'IPv6 address'
+
+	def pack(self, values):
+		'''
+		Validate a column of addresses at once.
+
+		Returns a NumPy uint64 array of shape (n, 2), holding the high and low
+		64 bits of each address (0 for invalid ones), and a boolean array that
+		is True where an address is valid.
+
+		'''
+		import numpy
+		ips, valid = self._pack(values)
+		mask = (1 << 64) - 1
+		packed = numpy.array([(ip >> 64, ip & mask) for ip in ips], dtype=numpy.uint64).reshape(len(ips), 2)
+		return packed, numpy.array(valid, dtype=bool)
+
+
+class ToIpv4Address(IsIpv4Address):
+	'''
+	Convert dotted-quad strings to ipaddress.IPv4Address objects.
+
+	The address is built from the parsed integer, so it is not parsed again.
+
+	'''
+
+	__slots__ = ('address_class',)
+	interned = True
+
+	def __init__(self):
+		# imported here, as it is slow to import and only needed for conversion
+		import ipaddress
+		self.address_class = ipaddress.IPv4Address
+
+	def _convert(self, value, ip):
+		return self.address_class(ip)
+
+
+class ToIpv6Address(IsIpv6Address):
+	'''
+	Convert strings to ipaddress.IPv6Address objects.
+
+	The address is built from the parsed integer, so it is not parsed again.
+
+	'''
+
+	__slots__ = ('address_class',)
+	interned = True
+
+	def __init__(self):
+		import ipaddress
+		self.address_class = ipaddress.IPv6Address
+
+	def _convert(self, value, ip):
+		return self.address_class(ip)
+
+
+class _NetworkValidator(Konvalidator):
+	'''
+	Checks networks in CIDR notation, address/prefix length.
+
+	An address alone is a network of one address, as in the ipaddress
+	module. With strict set, the default, host bits must be zero.
+
+	'''
+
+	__slots__ = ('strict',)
+	interned = True
+
+	parse = None
+	bits = None
+	kind = None
+
+	def __init__(self, strict=True):
+		self.strict = strict
+
+	def _network(self, value):
+		text = _text(value)
+		if text is None:
+			return None
+		address, slash, prefix = text.partition('/')
+		ip = self.parse(address)
+		if ip is None:
+			return None
+		if not slash:
+			return ip, self.bits
+		if not 0 < len(prefix) <= 3 or not _DIGITS.issuperset(prefix):
+			return None
+		prefix = int(prefix)
+		if prefix > self.bits:
+			return None
+		if self.strict and ip & ((1 << (self.bits - prefix)) - 1):
+			return None
+		return ip, prefix
+
+	def validate_value(self, value):
+		if self._network(value) is None:
+			raise ValidationError('The value %r is not a valid %s.', value, self.kind, code='not_ip_network', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		if self._network(value) is None:
+			return FAILED
+		return True, value
+
+
+class IsIpv4Network(_NetworkValidator):
+	'''
+	Only allow IPv4 networks such as 10.0.0.0/8, returning them unchanged.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	parse = staticmethod(parse_ipv4)
+	bits = 32
+	kind = 'IPv4 network'
+
+
+class IsIpv6Network(_NetworkValidator):
+	'''
+	Only allow IPv6 networks such as 2001:db8::/32, returning them unchanged.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	parse = staticmethod(parse_ipv6)
+	bits = 128
+	kind = 'IPv6 network'
@@ -1,67 +1,170 @@
-from . import Konvalidator, KonversionError, ValidationError
+from . import FAILED, Konvalidator, KonversionError, ValidationError
 
-class Range(Konvalidator):
+class ArrayKonvalidator(Konvalidator):
+	'''
+	A numeric validator that can also check whole NumPy arrays at once.
+
+	Subclasses define mask(values), which returns a boolean array that is
+	True wherever the scalar validator would accept the element.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	def validate_array(self, values):
+		'''
+		Return the pass mask and the (flat) indices of failing elements.
+
+		'''
+		import numpy
+		passed = self.mask(values)
+		return passed, numpy.flatnonzero(~passed)
+
+class Range(ArrayKonvalidator):
 	'''
 	Only allow values between certain inclusive bounds.
+
+	NaN is not within any bounds, so it fails whenever a bound is set.
 	
 	'''
 
+	__slots__ = ('minimum', 'maximum')
+	interned = True
+
 	def __init__(self, minimum=None, maximum=None):
 		self.minimum = minimum
 		self.maximum = maximum
 
 	def validate_value(self, value):
 		if self.minimum and value < self.minimum:
-			raise ValidationError('The specified value %s is below the required minimum %s' % (value, self.minimum))
+			raise ValidationError('The specified value %s is below the required minimum %s', value, self.minimum, code='below_minimum', validator=self, value=value)
 		if self.maximum and value > self.maximum:
-			raise ValidationError('The specified value %s is above the required maximum %s' % (value, self.maximum))
+			raise ValidationError('The specified value %s is above the required maximum %s', value, self.maximum, code='above_maximum', validator=self, value=value)
+		# only NaN is unequal to itself
+		if value != value and (self.minimum or self.maximum):
+			raise ValidationError('The specified value %s is not a number', value, code='not_a_number', validator=self, value=value)
 		
 		return True
 
+	def mask(self, values):
+		import numpy
+		values = numpy.asarray(values)
+		passed = numpy.ones(values.shape, dtype=bool)
+		# comparisons with NaN are false (and would warn), so NaN passes them and is failed apart
+		with numpy.errstate(invalid='ignore'):
+			if self.minimum:
+				passed &= ~(values < self.minimum)
+			if self.maximum:
+				passed &= ~(values > self.maximum)
+		if self.minimum or self.maximum:
+			passed &= values == values
+		return passed
+
+	def attempt(self, value):
+		if self.minimum and value < self.minimum:
+			return FAILED
+		if self.maximum and value > self.maximum:
+			return FAILED
+		if value != value and (self.minimum or self.maximum):
+			return FAILED
+		return True, value
+
 class Minimum(Range):
+	__slots__ = ()
+	interned = True
+
 	def __init__ (self, minimum):
 		super(Minimum, self).__init__(minimum=minimum)
 
 class Maximum(Range):
+	__slots__ = ()
+	interned = True
+
 	def __init__ (self, maximum):
 		super(Maximum, self).__init__(maximum=maximum)
 
-class Between(Konvalidator):
+class Between(ArrayKonvalidator):
 	'''
 	Only allow values between certain exclusive bounds.
 
+	As for Range, NaN fails whenever a bound is set.
+
 	'''
 
+	__slots__ = ('minimum', 'maximum')
+	interned = True
+
 	def __init__(self, minimum=None, maximum=None):
 		self.minimum = minimum
 		self.maximum = maximum
 
 	def validate_value(self, value):
 		if self.minimum and value <= self.minimum:
-			raise ValidationError('The specified value %s is not within lower bound %s' % (value, self.minimum))
+			raise ValidationError('The specified value %s is not within lower bound %s', value, self.minimum, code='below_minimum', validator=self, value=value)
 		if self.maximum and value >= self.maximum:
-			raise ValidationError('The specified value %s is not within upper bound %s' % (value, self.maximum))
+			raise ValidationError('The specified value %s is not within upper bound %s', value, self.maximum, code='above_maximum', validator=self, value=value)
+		if value != value and (self.minimum or self.maximum):
+			raise ValidationError('The specified value %s is not a number', value, code='not_a_number', validator=self, value=value)
 		
 		return True
 
-class IsEqual(Konvalidator):
+	def mask(self, values):
+		import numpy
+		values = numpy.asarray(values)
+		passed = numpy.ones(values.shape, dtype=bool)
+		# comparisons with NaN are false (and would warn), so NaN passes them and is failed apart
+		with numpy.errstate(invalid='ignore'):
+			if self.minimum:
+				passed &= ~(values <= self.minimum)
+			if self.maximum:
+				passed &= ~(values >= self.maximum)
+		if self.minimum or self.maximum:
+			passed &= values == values
+		return passed
+
+	def attempt(self, value):
+		if self.minimum and value <= self.minimum:
+			return FAILED
+		if self.maximum and value >= self.maximum:
+			return FAILED
+		if value != value and (self.minimum or self.maximum):
+			return FAILED
+		return True, value
+
+class IsEqual(ArrayKonvalidator):
 	'''
 	Make sure a value is equal to a pre-determined value.
 	'''
 
+	__slots__ = ('equal',)
+	interned = True
+
 	def __init__(self, equal):
 		self.equal = equal
 
 	def validate_value(self, value):
 		if value != self.equal:
-			raise ValidationError('The value %s is not equal to %s' % (value, self.equal))
+			raise ValidationError('The value %s is not equal to %s', value, self.equal, code='not_equal', validator=self, value=value)
 
 		return True
 
+	def mask(self, values):
+		import numpy
+		return ~(numpy.asarray(values) != self.equal)
+
+	def attempt(self, value):
+		if value != self.equal:
+			return FAILED
+		return True, value
+
 class IsZero(IsEqual):
 	'''
 	Only allow zero.
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsZero, self).__init__(0)
\ No newline at end of file
@@ -0,0 +1,196 @@
+import collections
+import functools
+import itertools
+import multiprocessing
+from multiprocessing.pool import ThreadPool
+import os
+import threading
+import time
+
+from . import KonvalResult, ValidationError, _validate_field, compile
+
+_worker_schema = None
+
+def _init_worker(schema):
+	'''
+	Compile the schema once in each worker process.
+
+	'''
+	global _worker_schema
+	_worker_schema = compile(schema)
+
+def _validate_chunk(chunk):
+	validate = _worker_schema.validate
+	outcomes = []
+	for record in chunk:
+		result = validate(record)
+		outcomes.append((result.errors, result.successes))
+	return outcomes
+
+def _chunks(records, chunksize):
+	records = iter(records)
+	while True:
+		chunk = list(itertools.islice(records, chunksize))
+		if not chunk:
+			return
+		yield chunk
+
+def _bounded_map(pool, function, chunks, window):
+	'''
+	Map a function over chunks in a pool, yielding outputs in order.
+
+	At most window chunks are in flight, so a long input stream is never
+	read ahead of the results being consumed.
+
+	'''
+	pending = collections.deque()
+	for chunk in chunks:
+		pending.append(pool.apply_async(function, (chunk,)))
+		if len(pending) > window:
+			yield pending.popleft().get()
+	while pending:
+		yield pending.popleft().get()
+
+def _validate_records(validate, chunk):
+	return [validate(record) for record in chunk]
+
+def _results(schema, outcomes):
+	for errors, successes in outcomes:
+		result = KonvalResult(schema)
+		result.errors = errors
+		result.successes = successes
+		yield result
+
+def validate_parallel(schema, records, processes=None, chunksize=1000):
+	'''
+	Validate an iterable of records across a pool of worker processes.
+
+	Records are read in chunks and handed to the workers, and results are
+	yielded lazily in the order of the input. The schema is handed to each
+	worker once, when the pool starts, and only a bounded number of chunks
+	is in flight at any time.
+
+	'''
+	compiled = compile(schema)
+	if processes is None:
+		processes = multiprocessing.cpu_count()
+	pool = multiprocessing.Pool(processes, _init_worker, (compiled.schema,))
+	try:
+		for outcomes in _bounded_map(pool, _validate_chunk, _chunks(records, chunksize), 2 * processes):
+			for result in _results(compiled.schema, outcomes):
+				yield result
+		pool.close()
+		pool.join()
+	finally:
+		pool.terminate()
+
+def validate_concurrent(schema, records, max_workers=None, chunksize=100):
+	'''
+	Validate an iterable of records on a pool of threads.
+
+	All threads share the one compiled schema, which is safe because the
+	built-in validators hold no per-call state. This pays off when
+	validators release the GIL, for instance while waiting on I/O. Results
+	are yielded lazily in the order of the input.
+
+	'''
+	compiled = compile(schema)
+	if max_workers is None:
+		max_workers = multiprocessing.cpu_count()
+	pool = ThreadPool(max_workers)
+	try:
+		validate_chunk = functools.partial(_validate_records, compiled.validate)
+		for results in _bounded_map(pool, validate_chunk, _chunks(records, chunksize), 2 * max_workers):
+			for result in results:
+				yield result
+		pool.close()
+		pool.join()
+	finally:
+		pool.terminate()
+
+def _is_io_bound(validator):
+	if getattr(validator, 'io_bound', False):
+		return True
+	children = list(getattr(validator, 'validators', ()))
+	for name in ('validator', 'other_validator'):
+		child = getattr(validator, name, None)
+		if child is not None:
+			children.append(child)
+	return any(_is_io_bound(child) for child in children)
+
+def _run_field(schema, name, value, chain):
+	# into a result of its own, so an abandoned field can't touch the caller's
+	result = KonvalResult(schema)
+	_validate_field(result, name, value, chain)
+	return result
+
+def _record(result, name, field_result):
+	if name in field_result.successes:
+		result.successes[name] = field_result.successes[name]
+	if name in field_result.errors:
+		result.errors[name] = field_result.errors[name]
+
+_async_pools = {}
+_async_pools_lock = threading.Lock()
+
+def _async_pool(size):
+	'''
+	Return the shared thread pool of a size, starting it on first use.
+
+	Pools are kept for the life of the process (and started afresh in a
+	forked child), so validating a record doesn't pay for starting threads.
+
+	'''
+	key = (os.getpid(), size)
+	pool = _async_pools.get(key)
+	if pool is None:
+		with _async_pools_lock:
+			pool = _async_pools.get(key)
+			if pool is None:
+				pool = _async_pools[key] = ThreadPool(size)
+	return pool
+
+def validate_async(schema, data, max_concurrency=8, timeout=None, pool=None):
+	'''
+	Validate a record, running fields with I/O-bound validators concurrently.
+
+	Fields whose validators (or any validator nested inside them) set
+	io_bound are run on a thread pool; all other fields are validated
+	inline as usual. Unless a pool is given, a long-lived pool of
+	max_concurrency threads is shared by all calls with that setting. If
+	timeout is given, fields still running after that many seconds fail
+	with a 'timeout' error. Their threads are abandoned rather than
+	interrupted, and stay busy until the validator returns.
+
+	'''
+	compiled = compile(schema)
+	result = KonvalResult(compiled.schema)
+	waiting = []
+	for name, value in data.iteritems():
+		chain = compiled.chains.get(name)
+		if chain is None:
+			continue
+		if any(_is_io_bound(validator) for validator in chain):
+			waiting.append((name, value, chain))
+		else:
+			_validate_field(result, name, value, chain)
+	if not waiting:
+		return result
+
+	if pool is None:
+		pool = _async_pool(max_concurrency)
+	pending = [(name, value, pool.apply_async(_run_field, (compiled.schema, name, value, chain)))
+		for name, value, chain in waiting]
+	deadline = None if timeout is None else time.time() + timeout
+	for name, value, field_result in pending:
+		try:
+			if deadline is None:
+				field_result = field_result.get()
+			else:
+				field_result = field_result.get(max(0, deadline - time.time()))
+		except multiprocessing.TimeoutError:
+			result.add_error(name, ValidationError('Validation of %s timed out after %s seconds', name, timeout,
+				code='timeout', value=value))
+			continue
+		_record(result, name, field_result)
+	return result
@@ -0,0 +1,216 @@
+import threading
+import timeit
+import weakref
+
+from . import CompiledSchema, FAILED, Konvalidator, KonvalError
+
+_PROFILED_METHODS = ('__call__', 'attempt', 'validate', 'convert')
+
+_timer = timeit.default_timer
+
+
+class Stats(object):
+	'''
+	Call counts and timings for one validator method or schema field.
+
+	total is the cumulative time including nested validators, own excludes
+	the time spent in nested validators. subject is the validator, if any.
+
+	'''
+
+	__slots__ = ('label', 'subject', 'calls', 'passes', 'fails', 'total', 'own')
+
+	def __init__(self, label, subject=None):
+		self.label = label
+		self.subject = subject
+		self.calls = 0
+		self.passes = 0
+		self.fails = 0
+		self.total = 0.0
+		self.own = 0.0
+
+
+def _all_subclasses(cls):
+	subclasses = []
+	for subclass in cls.__subclasses__():
+		subclasses.append(subclass)
+		subclasses.extend(_all_subclasses(subclass))
+	return subclasses
+
+
+class _FieldProbe(object):
+	'''
+	Stands in for a validator in a schema chain and times it under a field.
+
+	'''
+
+	def __init__(self, profiler, stats, validator):
+		self.profiler = profiler
+		self.stats = stats
+		self.validator = validator
+
+	def __call__(self, value):
+		return self.profiler._timed(self.stats, self.validator, value, False)
+
+	def attempt(self, value):
+		validator_attempt = getattr(self.validator, 'attempt', None)
+		if validator_attempt is None:
+			validator_attempt = self._attempt
+		return self.profiler._timed(self.stats, validator_attempt, value, True)
+
+	def _attempt(self, value):
+		try:
+			return True, self.validator(value)
+		except KonvalError:
+			return FAILED
+
+
+class Profiler(object):
+	'''
+	Record calls, pass/fail counts and timings per validator and field.
+
+	While the profiler is enabled, the validator methods (__call__, attempt,
+	validate and convert) of every Konvalidator class and
+	CompiledSchema.validate are swapped for timed versions. They are put
+	back when it is disabled, so profiling costs nothing the rest of the
+	time. Use it as a context manager:
+
+		with Profiler() as profiler:
+			konval.validate(schema, data)
+		print profiler.report()
+
+	Nested validators are timed individually, and a validator's own time
+	excludes the time spent in the validators it calls. Only one profiler
+	can be enabled at a time.
+
+	'''
+
+	_active = None
+
+	def __init__(self):
+		self.validators = {}
+		self.fields = {}
+		self._originals = []
+		self._probed = weakref.WeakKeyDictionary()
+		self._local = threading.local()
+
+	def __enter__(self):
+		self.enable()
+		return self
+
+	def __exit__(self, *exc_info):
+		self.disable()
+
+	def enable(self):
+		if Profiler._active is not None:
+			raise RuntimeError('Another profiler is already enabled')
+		Profiler._active = self
+		for cls in [Konvalidator] + _all_subclasses(Konvalidator):
+			for name in _PROFILED_METHODS:
+				function = cls.__dict__.get(name)
+				if function is not None:
+					self._originals.append((cls, name, function))
+					setattr(cls, name, self._wrap(name, function))
+		function = CompiledSchema.__dict__['validate']
+		self._originals.append((CompiledSchema, 'validate', function))
+		CompiledSchema.validate = self._wrap_schema(function)
+
+	def disable(self):
+		for cls, name, function in reversed(self._originals):
+			setattr(cls, name, function)
+		self._originals = []
+		self._probed = weakref.WeakKeyDictionary()
+		Profiler._active = None
+
+	def _stack(self):
+		stack = getattr(self._local, 'stack', None)
+		if stack is None:
+			stack = self._local.stack = []
+		return stack
+
+	def _timed(self, stats, function, value, returns_outcome):
+		stack = self._stack()
+		stack.append(0.0)
+		start = _timer()
+		ok = False
+		try:
+			result = function(value)
+			ok = result[0] if returns_outcome else True
+			return result
+		finally:
+			elapsed = _timer() - start
+			nested = stack.pop()
+			if stack:
+				stack[-1] += elapsed
+			stats.calls += 1
+			if ok:
+				stats.passes += 1
+			else:
+				stats.fails += 1
+			stats.total += elapsed
+			stats.own += elapsed - nested
+
+	def _validator_stats(self, validator, method):
+		key = (id(validator), method)
+		stats = self.validators.get(key)
+		if stats is None:
+			# holding the validator as the subject keeps its id from being reused
+			stats = self.validators[key] = Stats('%r.%s' % (validator, method), validator)
+		return stats
+
+	def _wrap(self, name, function):
+		profiler = self
+		returns_outcome = name == 'attempt'
+
+		def method(self, value):
+			stats = profiler._validator_stats(self, name)
+			return profiler._timed(stats, lambda v: function(self, v), value, returns_outcome)
+		method.__name__ = function.__name__
+		method.__doc__ = function.__doc__
+		return method
+
+	def _wrap_schema(self, function):
+		profiler = self
+
+		def validate(self, *args, **kwargs):
+			return function(profiler._probe(self), *args, **kwargs)
+		validate.__doc__ = function.__doc__
+		return validate
+
+	def _probe(self, compiled):
+		'''
+		Return a copy of a compiled schema whose validators are field probes.
+
+		'''
+		clone = self._probed.get(compiled)
+		if clone is None:
+			clone = object.__new__(compiled.__class__)
+			clone.__dict__.update(compiled.__dict__)
+			clone.chains = {}
+			for name, chain in compiled.chains.iteritems():
+				stats = self.fields.get(name)
+				if stats is None:
+					stats = self.fields[name] = Stats(name)
+				clone.chains[name] = tuple(_FieldProbe(self, stats, v) for v in chain)
+			self._probed[compiled] = clone
+		return clone
+
+	def report(self, limit=20):
+		'''
+		Return a text report of the slowest fields and validators.
+
+		'''
+		lines = []
+		header = '%-50s %8s %8s %8s %10s %10s' % ('', 'calls', 'passes', 'fails', 'total ms', 'own ms')
+		for title, rows, key in [
+			('Fields by total time', self.fields.values(), lambda s: s.total),
+			('Validators by own time', self.validators.values(), lambda s: s.own),
+		]:
+			lines.append(title)
+			lines.append(header)
+			for stats in sorted(rows, key=key, reverse=True)[:limit]:
+				label = stats.label if len(stats.label) <= 50 else stats.label[:47] + '...'
+				lines.append('%-50s %8d %8d %8d %10.3f %10.3f' % (label, stats.calls, stats.passes,
+					stats.fails, stats.total * 1000, stats.own * 1000))
+			lines.append('')
+		return '\n'.join(lines)
@@ -0,0 +1,215 @@
+'''
+Compact, columnar storage for the results of validating many records.
+
+'''
+
+import array
+import bisect
+
+from . import KonvalError, KonvalResult, compile, validate_many
+
+
+def _get_bit(bitmap, index):
+	return bitmap[index >> 3] >> (index & 7) & 1
+
+
+def _set_bit(bitmap, index):
+	bitmap[index >> 3] |= 1 << (index & 7)
+
+
+class _Column(object):
+	'''
+	The outcomes of one field: which rows had it, which passed, and the
+	codes (and optionally messages and values) of the failures.
+
+	'''
+
+	__slots__ = ('present', 'passed', 'failures', 'error_rows', 'error_codes', 'messages', 'values')
+
+	def __init__(self, keep_messages, keep_values):
+		self.present = bytearray()
+		self.passed = bytearray()
+		self.failures = 0
+		self.error_rows = array.array('L')
+		self.error_codes = array.array('H')
+		self.messages = [] if keep_messages else None
+		self.values = [] if keep_values else None
+
+
+class ResultSet(object):
+	'''
+	The results of validating many records, stored by field.
+
+	Rather than a KonvalResult per record, each field keeps bitmaps of the
+	rows that had it and the rows where it passed, and, for each error, the
+	row and an index into a shared table of error codes and classes. Failure counts and
+	the first failing rows of a field are answered without touching any
+	per-record objects, and result(row) rebuilds the KonvalResult for one
+	row on demand.
+
+	Error messages and converted values take the most memory, so they are
+	only kept with keep_messages and keep_values. Without them, rebuilt
+	errors carry their code as their message and rebuilt results have no
+	valid values. Values are kept only for fields that passed.
+
+	'''
+
+	def __init__(self, schema, keep_messages=False, keep_values=False):
+		self.compiled = compile(schema)
+		self.keep_messages = keep_messages
+		self.keep_values = keep_values
+		self.rows = 0
+		self.invalid = bytearray()
+		self.codes = []
+		self.error_classes = []
+		self._code_index = {}
+		self.columns = dict((name, _Column(keep_messages, keep_values)) for name in self.compiled.keys())
+
+	@classmethod
+	def collect(cls, schema, records, keep_messages=False, keep_values=False):
+		'''
+		Validate an iterable of records into a new result set.
+
+		'''
+		results = cls(schema, keep_messages, keep_values)
+		results.extend(validate_many(results.compiled, records))
+		return results
+
+	def __len__(self):
+		return self.rows
+
+	def _code(self, error):
+		error_class = error.__class__ if isinstance(error, KonvalError) else KonvalError
+		key = (error_class, getattr(error, 'code', None))
+		index = self._code_index.get(key)
+		if index is None:
+			index = self._code_index[key] = len(self.codes)
+			self.error_classes.append(error_class)
+			self.codes.append(key[1])
+		return index
+
+	def add(self, result):
+		'''
+		Append the KonvalResult of the next row.
+
+		'''
+		row = self.rows
+		if not row & 7:
+			self.invalid.append(0)
+			for column in self.columns.itervalues():
+				column.present.append(0)
+				column.passed.append(0)
+		errors = result.errors
+		row_invalid = False
+		for name, column in self.columns.iteritems():
+			field_errors = errors.get(name)
+			if field_errors:
+				row_invalid = True
+				_set_bit(column.present, row)
+				column.failures += 1
+				for error in field_errors:
+					column.error_rows.append(row)
+					column.error_codes.append(self._code(error))
+					if column.messages is not None:
+						column.messages.append(error.message if isinstance(error, KonvalError) else error)
+				if column.values is not None:
+					column.values.append(None)
+			elif name in result.successes:
+				_set_bit(column.present, row)
+				_set_bit(column.passed, row)
+				if column.values is not None:
+					column.values.append(result.successes[name])
+			elif column.values is not None:
+				column.values.append(None)
+		if row_invalid:
+			_set_bit(self.invalid, row)
+		self.rows = row + 1
+
+	def extend(self, results):
+		for result in results:
+			self.add(result)
+
+	def is_valid(self, row):
+		self._check_row(row)
+		return not _get_bit(self.invalid, row)
+
+	def invalid_count(self):
+		return sum(bin(byte).count('1') for byte in self.invalid)
+
+	def failure_counts(self):
+		'''
+		Return the number of failing rows for each field that ever failed.
+
+		'''
+		return dict((name, column.failures) for name, column in self.columns.iteritems() if column.failures)
+
+	def code_counts(self, name=None):
+		'''
+		Return how often each error code occurred, in one field or in all.
+
+		'''
+		columns = self.columns.values() if name is None else [self.columns[name]]
+		by_index = {}
+		for column in columns:
+			for index in column.error_codes:
+				by_index[index] = by_index.get(index, 0) + 1
+		# a code can be raised by several error classes, so merge their counts
+		counts = {}
+		for index, count in by_index.iteritems():
+			code = self.codes[index]
+			counts[code] = counts.get(code, 0) + count
+		return counts
+
+	def first_failures(self, name, limit=10):
+		'''
+		Return the first rows, up to limit, where a field failed.
+
+		'''
+		rows = []
+		for row in self.columns[name].error_rows:
+			if not rows or rows[-1] != row:
+				if len(rows) == limit:
+					break
+				rows.append(row)
+		return rows
+
+	def invalid_rows(self):
+		'''
+		Yield the indices of the rows with any error.
+
+		'''
+		invalid = self.invalid
+		for offset, byte in enumerate(invalid):
+			while byte:
+				low = byte & -byte
+				yield (offset << 3) + low.bit_length() - 1
+				byte ^= low
+
+	def result(self, row):
+		'''
+		Rebuild the KonvalResult of a row.
+
+		'''
+		self._check_row(row)
+		result = KonvalResult(self.compiled.schema)
+		for name, column in self.columns.iteritems():
+			if not _get_bit(column.present, row):
+				continue
+			if _get_bit(column.passed, row):
+				if column.values is not None:
+					result.successes[name] = column.values[row]
+				continue
+			error_rows = column.error_rows
+			start = bisect.bisect_left(error_rows, row)
+			end = bisect.bisect_right(error_rows, row, start)
+			errors = result.errors[name] = []
+			for index in xrange(start, end):
+				code_index = column.error_codes[index]
+				code = self.codes[code_index]
+				message = column.messages[index] if column.messages is not None else code or ''
+				errors.append(self.error_classes[code_index](message, code=code))
+		return result
+
+	def _check_row(self, row):
+		if not 0 <= row < self.rows:
+			raise IndexError('Row %d is out of range' % row)
@@ -1,42 +1,66 @@
 import re
 
-from . import Konvalidator, KonversionError, ValidationError, canonicals
+from . import FAILED, Konvalidator, KonversionError, ValidationError, canonicals
 
 class IsNonBlank(Konvalidator):
 	''' Ensures non blank string '''
 
+	__slots__ = ()
+	interned = True
+
 	def validate_value(self, value):
 		if len(value) <= 0:
-			raise ValidationError('The value %s is empty.' % repr(value))
+			raise ValidationError('The value %r is empty.', value, code='empty', validator=self, value=value)
 		return True
 
+	def attempt(self, value):
+		if len(value) <= 0:
+			return FAILED
+		return True, value
+
 class ToStripped(Konvalidator):
 	'''
 	Transform strings by stripping flanking space.
 
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def convert_value(self, value):
 		try:
 			stripped = value.strip()
 			return stripped
 		except:
-			raise KonversionError('Cannot strip spaces from %s' % repr(value))
+			raise KonversionError('Cannot strip spaces from %r', value, code='conversion', validator=self, value=value)
 
+	def attempt(self, value):
+		try:
+			return True, value.strip()
+		except:
+			return FAILED
 
 class ToLower(Konvalidator):
 	'''
 	Transform string to lower case, conversion error on type exception
 	
 	'''
+
+	__slots__ = ()
+	interned = True
 	
 	def convert_value(self, value):
 		try:
 			lower_case = value.lower()
 			return lower_case
 		except:
-			raise KonversionError('Cannot convert %s to lowercase.' % repr(value))
+			raise KonversionError('Cannot convert %r to lowercase.', value, code='conversion', validator=self, value=value)
 
+	def attempt(self, value):
+		try:
+			return True, value.lower()
+		except:
+			return FAILED
 
 class ToUpper(Konvalidator):
 	'''
@@ -44,12 +68,81 @@ class ToUpper(Konvalidator):
 		
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def convert_value (self, value):
 		try:
 			upper_case = value.upper()
 			return upper_case
 		except:
-			raise KonversionError('Cannot covert %s to uppercase.' % repr(value))
+			raise KonversionError('Cannot covert %r to uppercase.', value, code='conversion', validator=self, value=value)
+
+	def attempt(self, value):
+		try:
+			return True, value.upper()
+		except:
+			return FAILED
+
+_STRING_TYPES = (unicode, str, bytearray, memoryview)
+
+class ToString(Konvalidator):
+	'''
+	Convert values that are not strings to unicode.
+
+	Text and bytes-like values (str, bytearray and memoryview) are passed
+	through as they are, so that checks on them need not decode or copy.
+
+	'''
+
+	__slots__ = ()
+	interned = True
+
+	def convert_value(self, value):
+		if isinstance(value, _STRING_TYPES):
+			return value
+		try:
+			return unicode(value)
+		except:
+			raise KonversionError('The value %r could not be converted to a string', value, code='conversion', validator=self, value=value)
+
+	def attempt(self, value):
+		if isinstance(value, _STRING_TYPES):
+			return True, value
+		try:
+			return True, unicode(value)
+		except:
+			return FAILED
+
+class ToDecoded(Konvalidator):
+	'''
+	Decode bytes-like values to unicode, for converters that need text.
+
+	Unicode values are passed through and anything else fails.
+
+	'''
+
+	__slots__ = ('encoding',)
+	interned = True
+
+	def __init__(self, encoding='utf-8'):
+		self.encoding = encoding
+
+	def convert_value(self, value):
+		ok, text = self.attempt(value)
+		if not ok:
+			raise KonversionError('The value %r could not be decoded as %s', value, self.encoding, code='conversion', validator=self, value=value)
+		return text
+
+	def attempt(self, value):
+		if isinstance(value, unicode):
+			return True, value
+		if value.__class__ is memoryview:
+			value = value.tobytes()
+		try:
+			return True, value.decode(self.encoding)
+		except (AttributeError, UnicodeError):
+			return FAILED
 
 class IsRegexMatch(Konvalidator):
 	'''
@@ -57,19 +150,120 @@ class IsRegexMatch(Konvalidator):
 
 	This uses a case insensitive match to add flexibility for strings
 	that are going to be converted to lower (or upper) case anyway.
+
+	Bytes, bytearray and memoryview values are matched as they are, without
+	decoding (re can't read a memoryview, so that is copied to bytes).
+
+	The pattern is compiled when it is first used, not when the validator
+	is created.
 		
 	'''
 
+	__slots__ = ('pattern', 'match', '_re')
+	interned = True
+
 	def __init__(self, pattern):
-		self.re = re.compile(pattern, re.IGNORECASE)
 		self.pattern = pattern
+		self.match = None
+		self._re = None
+
+	@property
+	def re(self):
+		if self._re is None:
+			self._compile()
+		return self._re
+
+	def _compile(self):
+		compiled = re.compile(self.pattern, re.IGNORECASE)
+		# interned validators are frozen, so set through object
+		object.__setattr__(self, '_re', compiled)
+		object.__setattr__(self, 'match', compiled.match)
+		return compiled.match
 
 	def validate_value(self, value):
-		result = self.re.match(value)
+		match = self.match or self._compile()
+		result = match(value.tobytes() if value.__class__ is memoryview else value)
 		if not result:
-			raise ValidationError('The value %s does not match the pattern %s' % (repr(value), self.pattern))
+			raise ValidationError('The value %r does not match the pattern %s', value, self.pattern, code='no_match', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		match = self.match or self._compile()
+		if match(value.tobytes() if value.__class__ is memoryview else value):
+			return True, value
+		return FAILED
+
+class RegexSet(Konvalidator):
+	'''
+	Only allow values that match any of a set of regular expressions.
+
+	The patterns are compiled into one alternation, so each value is scanned
+	in a single call instead of once per pattern, and which tells you the
+	index of the pattern that matched. As with IsRegexMatch, matching is
+	case insensitive, patterns are tried in the order given, and they are
+	compiled on first use. Patterns can't use numbered backreferences or
+	share group names.
+
+	'''
+
+	__slots__ = ('patterns', 'match', '_re', '_group_index')
+	interned = True
+
+	def __init__(self, patterns):
+		self.patterns = tuple(patterns)
+		self.match = None
+		self._re = None
+		self._group_index = None
+
+	@property
+	def re(self):
+		if self._re is None:
+			self._compile()
+		return self._re
+
+	@property
+	def group_index(self):
+		if self._group_index is None:
+			self._compile()
+		return self._group_index
+
+	def _compile(self):
+		compiled = re.compile('|'.join('(%s)' % pattern for pattern in self.patterns), re.IGNORECASE)
+		# map the outer group of each alternative back to its pattern
+		group_index = {}
+		group = 1
+		for i, pattern in enumerate(self.patterns):
+			group_index[group] = i
+			group += re.compile(pattern).groups + 1
+		# interned validators are frozen, so set through object
+		object.__setattr__(self, '_group_index', group_index)
+		object.__setattr__(self, '_re', compiled)
+		object.__setattr__(self, 'match', compiled.match)
+		return compiled.match
+
+	def which(self, value):
+		'''
+		Return the index of the first pattern that matches, or None.
+
+		'''
+		match = self.match or self._compile()
+		result = match(value.tobytes() if value.__class__ is memoryview else value)
+		if result is None:
+			return None
+		return self._group_index[result.lastindex]
+
+	def validate_value(self, value):
+		match = self.match or self._compile()
+		if not match(value.tobytes() if value.__class__ is memoryview else value):
+			raise ValidationError('The value %r does not match any of the patterns %s', value, self.patterns, code='no_match', validator=self, value=value)
 		return True
 
+	def attempt(self, value):
+		match = self.match or self._compile()
+		if match(value.tobytes() if value.__class__ is memoryview else value):
+			return True, value
+		return FAILED
+
 class ToCanonical(Konvalidator):
 	'''
 	Reduce strings to a canonical form.
@@ -81,56 +275,100 @@ class ToCanonical(Konvalidator):
 		
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def convert_value(self, value):
 		try:
 			canonical_value = canonicals.CANON_SPACE_RE.sub('_', value.strip().lower())
 			return canonical_value
 		except:
-			raise KonversionError('Could not convert %s to canonical form.' % type(value))
+			raise KonversionError('Could not convert %s to canonical form.', type(value), code='conversion', validator=self, value=value)
+
+	def attempt(self, value):
+		try:
+			return True, canonicals.CANON_SPACE_RE.sub('_', value.strip().lower())
+		except:
+			return FAILED
 
 class ToSlug(Konvalidator):
 	''' Convert a string to a slug value '''
 
+	__slots__ = ()
+	interned = True
+
 	def convert_value(self, value):
 		try:
 			clean_value = re.sub(canonicals.PUNCTUATION_RE, '', value)
 			slug_value = re.sub(canonicals.SLUG_RE, '-', clean_value.lower())
 			return slug_value
 		except:
-			raise KonversionError('Could not slugify %s' % repr(value))
+			raise KonversionError('Could not slugify %r', value, code='conversion', validator=self, value=value)
+
+	def attempt(self, value):
+		try:
+			return True, re.sub(canonicals.SLUG_RE, '-', re.sub(canonicals.PUNCTUATION_RE, '', value).lower())
+		except:
+			return FAILED
 
 class LengthRange(Konvalidator):
 	''' Inclusive length range '''
 
+	__slots__ = ('minimum', 'maximum')
+	interned = True
+
 	def __init__(self, minimum=None, maximum=None):
 		self.minimum = minimum
 		self.maximum = maximum
 
 	def validate_value(self, value):
 		if self.minimum and len(value) < self.minimum:
-			raise ValidationError('The specified value %s is below the minimum length.' % repr(value))
+			raise ValidationError('The specified value %r is below the minimum length.', value, code='too_short', validator=self, value=value)
 		if self.maximum and len(value) > self.maximum:
-			raise ValidationError('The specified value %s is below the maxium length.' % repr(value))
+			raise ValidationError('The specified value %r is above the maximum length.', value, code='too_long', validator=self, value=value)
 		return True
 
+	def attempt(self, value):
+		if self.minimum and len(value) < self.minimum:
+			return FAILED
+		if self.maximum and len(value) > self.maximum:
+			return FAILED
+		return True, value
+
 class LengthMinimum(LengthRange):
 	''' Ensure minimum length string '''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self, minimum=None):
 		super(LengthMinimum, self).__init__(minimum=minimum)
 
 class LengthMaximum(LengthRange):
 	''' Ensure maximum length string '''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self, maximum=None):
 		super(LengthMaximum, self).__init__(maximum=maximum)
 
 class LengthBetween(LengthRange):
 	''' Ensure exclusive length bounds '''
 
+	__slots__ = ()
+	interned = True
+
 	def validate_value(self, value):
 		if self.minimum and len(value) <= self.minimum:
-			raise ValidationError('The length of %s is not within lower bound %s' % repr(value))
+			raise ValidationError('The length of %r is not within lower bound %s', value, self.minimum, code='too_short', validator=self, value=value)
+		if self.maximum and len(value) >= self.maximum:
+			raise ValidationError('The length of %r is not within upper bound %s', value, self.maximum, code='too_long', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		if self.minimum and len(value) <= self.minimum:
+			return FAILED
 		if self.maximum and len(value) >= self.maximum:
-			raise ValidationError('The length of %s is not within upper bound %s' % repr(value))
-		return True
\ No newline at end of file
+			return FAILED
+		return True, value
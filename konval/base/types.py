@@ -1,4 +1,4 @@
-from . import Konvalidator, KonversionError, ValidationError
+from . import FAILED, Konvalidator, KonversionError, ValidationError
 
 class ToType(Konvalidator):
 	'''
@@ -10,6 +10,9 @@ class ToType(Konvalidator):
 	the parameter callable.
 	'''
 
+	__slots__ = ('to_type', 'type_name')
+	interned = True
+
 	def __init__(self, to_type):
 		self.to_type = to_type
 		if hasattr (to_type, '__name__'):
@@ -22,30 +25,45 @@ class ToType(Konvalidator):
 			new_type = self.to_type(value)
 			return new_type
 		except:
-			raise KonversionError('The value %s could not be converted to %s' % (repr(value), self.type_name))
+			raise KonversionError('The value %r could not be converted to %s', value, self.type_name, code='conversion', validator=self, value=value)
 
+	def attempt(self, value):
+		try:
+			return True, self.to_type(value)
+		except:
+			return FAILED
 
 class IsInstance(Konvalidator):
 	'''
 	Checks that values are instances of a list of classes or their subclasses.
 	'''
-	
+
+	__slots__ = ('allowed_classes',)
+	interned = True
+
 	def __init__(self, allowed_classes):
 		self.allowed_classes = tuple(allowed_classes)
 	
 	def validate_value(self, value):
 		result = isinstance(value, self.allowed_classes)
 		if not result:
-			raise ValidationError('Value %s is not in the allowed class list: %s' % (repr(value), self.allowed_classes))
+			raise ValidationError('Value %r is not in the allowed class list: %s', value, self.allowed_classes, code='not_instance', validator=self, value=value)
 		return True
 
+	def attempt(self, value):
+		if isinstance(value, self.allowed_classes):
+			return True, value
+		return FAILED
 
 class IsType(Konvalidator):
 	'''
 	Checks that values are instances of a list of classes (not their subclasses).
 	
 	'''
-	
+
+	__slots__ = ('allowed_classes',)
+	interned = True
+
 	def __init__(self, allowed_classes):
 		if type(allowed_classes) is not list:
 			allowed_classes = [allowed_classes]
@@ -55,4 +73,9 @@ class IsType(Konvalidator):
 		for allowed_class in self.allowed_classes:
 			if type(value) is allowed_class:
 				return True
-		raise ValidationError('The value %s is not any of the allowed types: %s' % (repr(value), self.allowed_classes))
\ No newline at end of file
+		raise ValidationError('The value %r is not any of the allowed types: %s', value, self.allowed_classes, code='not_type', validator=self, value=value)
+
+	def attempt(self, value):
+		if type(value) in self.allowed_classes:
+			return True, value
+		return FAILED
@@ -1,4 +1,37 @@
-from . import Konvalidator, KonversionError, ValidationError, canonicals
+import binascii
+import bisect
+import errno
+import io
+import json
+import mmap
+import os
+import struct
+
+from . import FAILED, Konvalidator, KonversionError, ValidationError, _rebuild, canonicals
+from .strings import ToCanonical
+
+_to_canonical = ToCanonical()
+
+
+class _Preview(object):
+	'''
+	Shows the first few terms of a vocabulary when an error is rendered.
+
+	'''
+
+	__slots__ = ('terms', 'limit')
+
+	def __init__(self, terms, limit=5):
+		self.terms = terms
+		self.limit = limit
+
+	def __str__(self):
+		shown = ', '.join(repr(term) for _, term in zip(range(self.limit), self.terms))
+		count = len(self.terms)
+		if count > self.limit:
+			return '[%s, ... (%d terms)]' % (shown, count)
+		return '[%s]' % shown
+
 
 class Synonyms(Konvalidator):
 	'''
@@ -6,25 +39,298 @@ class Synonyms(Konvalidator):
 
 	'''
 
+	__slots__ = ('mapping',)
+	interned = True
+
 	def __init__(self, mapping):
 		self.mapping = mapping
 
 	def convert_value (self, value):
 		if value not in self.mapping:
-			raise KonversionError('The value %s has no valid synonym mapping in %s' % (repr(value), self.mapping))
+			raise KonversionError('The value %r has no valid synonym mapping in %s', value, _Preview(self.mapping), code='no_synonym', validator=self, value=value)
 		
 		return self.mapping[value]
 
+	def attempt(self, value):
+		if value not in self.mapping:
+			return FAILED
+		return True, self.mapping[value]
+
+_HEADER = struct.Struct('<8sQ')
+_ENTRY = struct.Struct('<QII')
+_MAGIC = 'KONVSYN1'
+
+
+def _encode_key(key):
+	if isinstance(key, unicode):
+		return key.encode('utf-8')
+	if isinstance(key, str):
+		return key
+	return None
+
+
+class SynonymFile(object):
+	'''
+	A read-only mapping kept in a memory-mapped file, for use with Synonyms.
+
+	The file holds the keys in sorted order, and lookups binary search them
+	in place, so opening it takes no time whatever its size, and processes
+	reading the same file share its pages through the OS cache. Keys are
+	strings (unicode keys are stored as UTF-8) and values anything JSON can
+	hold. Write files with write_synonym_file or konval-build-synonyms.
+	Pickling a SynonymFile pickles its path, so worker processes open the
+	file rather than receive a copy.
+
+	'''
+
+	def __init__(self, path):
+		self.path = path
+		with open(path, 'rb') as source:
+			self._map = mmap.mmap(source.fileno(), 0, access=mmap.ACCESS_READ)
+		if len(self._map) < _HEADER.size or self._map[:len(_MAGIC)] != _MAGIC:
+			self._map.close()
+			raise ValueError('%s is not a synonym file' % path)
+		self._count = _HEADER.unpack_from(self._map, 0)[1]
+
+	def __repr__(self):
+		return 'SynonymFile(%r)' % self.path
+
+	def __reduce__(self):
+		return (self.__class__, (self.path,))
+
+	def __len__(self):
+		return self._count
+
+	def _entry(self, position):
+		return _ENTRY.unpack_from(self._map, _HEADER.size + position * _ENTRY.size)
+
+	def _find(self, key):
+		key = _encode_key(key)
+		if key is None:
+			return None
+		data = self._map
+		low, high = 0, self._count
+		while low < high:
+			middle = (low + high) // 2
+			offset, key_length, value_length = self._entry(middle)
+			probe = data[offset:offset + key_length]
+			if probe < key:
+				low = middle + 1
+			elif probe > key:
+				high = middle
+			else:
+				return offset + key_length, value_length
+		return None
+
+	def __contains__(self, key):
+		return self._find(key) is not None
+
+	def __getitem__(self, key):
+		found = self._find(key)
+		if found is None:
+			raise KeyError(key)
+		offset, length = found
+		return json.loads(self._map[offset:offset + length])
+
+	def get(self, key, default=None):
+		try:
+			return self[key]
+		except KeyError:
+			return default
+
+	def __iter__(self):
+		data = self._map
+		for position in xrange(self._count):
+			offset, key_length, _ = self._entry(position)
+			yield data[offset:offset + key_length].decode('utf-8')
+
+	def close(self):
+		self._map.close()
+
+
+def _create_temporary(directory, prefix):
+	'''
+	Create a new, empty file under a random name, returning its fd and path.
+
+	Unlike mkstemp, which makes the file private, this asks for mode 0666
+	and lets the kernel apply the umask, so the file gets the permissions
+	of any other new file.
+
+	'''
+	flags = os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, 'O_BINARY', 0)
+	for _ in xrange(100):
+		path = os.path.join(directory, prefix + binascii.hexlify(os.urandom(6)))
+		try:
+			return os.open(path, flags, 0666), path
+		except OSError as e:
+			if e.errno != errno.EEXIST:
+				raise
+	raise IOError(errno.EEXIST, 'No free temporary file name in %s' % directory)
+
+
+def write_synonym_file(path, pairs):
+	'''
+	Write a mapping, or an iterable of (key, value) pairs, as a SynonymFile.
+
+	Later pairs replace earlier ones with the same key. The entries are
+	sorted in memory, and the file is written alongside and renamed into
+	place, so processes with the old file open keep reading it unchanged.
+	Returns the number of entries written.
+
+	'''
+	if hasattr(pairs, 'iteritems'):
+		pairs = pairs.iteritems()
+	entries = {}
+	for key, value in pairs:
+		encoded = _encode_key(key)
+		if encoded is None:
+			raise TypeError('Synonym keys must be strings, not %r' % (key,))
+		entries[encoded] = json.dumps(value, separators=(',', ':'))
+	keys = sorted(entries)
+
+	directory = os.path.dirname(os.path.abspath(path))
+	handle, temporary = _create_temporary(directory, '.synonyms-')
+	try:
+		with os.fdopen(handle, 'wb') as out:
+			out.write(_HEADER.pack(_MAGIC, len(keys)))
+			offset = _HEADER.size + len(keys) * _ENTRY.size
+			for key in keys:
+				value = entries[key]
+				out.write(_ENTRY.pack(offset, len(key), len(value)))
+				offset += len(key) + len(value)
+			for key in keys:
+				out.write(key)
+				out.write(entries[key])
+		os.rename(temporary, path)
+	except:
+		os.remove(temporary)
+		raise
+	return len(keys)
+
 
 class InList(Konvalidator):
 	'''
 	Ensure values fall within a pre-defined list.
 	'''
-	
+
+	__slots__ = ('term_list',)
+	interned = True
+
 	def __init__(self, term_list):
 		self.term_list = term_list
 
 	def validate_value(self, value):
 		if value not in self.term_list:
-			raise ValidationError('Value %s is not in term list %s' % (repr(value), self.term_list))
-		return True
\ No newline at end of file
+			raise ValidationError('Value %r is not in term list %s', value, _Preview(self.term_list), code='not_in_list', validator=self, value=value)
+		return True
+
+	def attempt(self, value):
+		if value not in self.term_list:
+			return FAILED
+		return True, value
+
+
+class InVocabulary(Konvalidator):
+	'''
+	Ensure values are terms of a large, hash-indexed vocabulary.
+
+	Membership takes constant time however many terms there are. With
+	canonical=True, values and terms are compared in the canonical form of
+	strings.ToCanonical (stripped, lowercase, underscores for spaces and
+	dashes), and a matching value is converted to the term as it is written
+	in the vocabulary. Terms can be listed by prefix, and read from a text
+	file with from_file.
+
+	'''
+
+	__slots__ = ('canonical', 'index', 'sorted_keys')
+	interned = True
+
+	def __init__(self, terms, canonical=False):
+		# the terms live on in the index only; pickling and repr use that
+		object.__setattr__(self, '_init_args', None)
+		self.canonical = canonical
+		index = {}
+		for term in terms:
+			key = self._key(term) if canonical else term
+			if key is not None and key not in index:
+				index[key] = term
+		self.index = index
+		self.sorted_keys = None
+
+	@classmethod
+	def from_file(cls, path, canonical=False, encoding='utf-8'):
+		'''
+		Load a vocabulary with one term per line.
+
+		Blank lines and lines starting with # are skipped.
+
+		'''
+		with io.open(path, encoding=encoding) as terms:
+			stripped = (line.strip() for line in terms)
+			return cls([term for term in stripped if term and not term.startswith('#')], canonical)
+
+	def __reduce_ex__(self, protocol):
+		# rebuilt from the index, as the terms given may have been a generator
+		return (_rebuild, (self.__class__, (self.index.values(), self.canonical), {}))
+
+	def __repr__(self):
+		return '%s(<%d terms>, canonical=%r)' % (self.__class__.__name__, len(self.index), self.canonical)
+
+	@property
+	def terms(self):
+		'''
+		The distinct terms, as written in the vocabulary.
+
+		'''
+		return self.index.values()
+
+	def _key(self, value):
+		ok, key = _to_canonical.attempt(value)
+		return key if ok else None
+
+	def __contains__(self, value):
+		return self.attempt(value)[0]
+
+	def __len__(self):
+		return len(self.index)
+
+	def prefix(self, prefix, limit=None):
+		'''
+		Return the terms starting with prefix, in sorted order.
+
+		With canonical set, the prefix is compared in canonical form too.
+
+		'''
+		if self.canonical:
+			prefix = self._key(prefix)
+			if prefix is None:
+				return []
+		keys = self.sorted_keys
+		if keys is None:
+			# sorted lazily, on the first prefix query; frozen, so set through object
+			keys = sorted(self.index)
+			object.__setattr__(self, 'sorted_keys', keys)
+		matches = []
+		for position in xrange(bisect.bisect_left(keys, prefix), len(keys)):
+			key = keys[position]
+			if not key.startswith(prefix) or len(matches) == limit:
+				break
+			matches.append(self.index[key])
+		return matches
+
+	def validate_value(self, value):
+		if not self.attempt(value)[0]:
+			raise ValidationError('Value %r is not in vocabulary %s', value, _Preview(self.index.viewvalues()),
+				code='not_in_list', validator=self, value=value)
+		return True
+
+	def convert_value(self, value):
+		return self.attempt(value)[1]
+
+	def attempt(self, value):
+		key = self._key(value) if self.canonical else value
+		try:
+			return True, self.index[key]
+		except (KeyError, TypeError):
+			return FAILED
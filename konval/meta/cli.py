@@ -1,3 +1,21 @@
+'''
+Validators for command-line input, the konval-validate command, which
+streams a CSV or JSONL file through a schema, and konval-build-synonyms,
+which writes a memory-mapped synonym file for vocabulary.SynonymFile.
+
+'''
+
+import argparse
+import collections
+import csv
+import importlib
+import json
+import sys
+import time
+
+import konval
+
+
 # class ToYesOrNo(Synonyms):
 # 	'''
 # 	Determines whether input is affirmative or negative based on
@@ -16,4 +34,227 @@
 # 		except:
 # 			pass
 
-# 		raise KonversionError('The value %s could not be determined as Yes or No' % value)
\ No newline at end of file
+# 		raise KonversionError('The value %s could not be determined as Yes or No' % value)
+
+
+def load_schema(spec):
+	'''
+	Import a schema given as "package.module" or "package.module:name".
+
+	The attribute defaults to "schema".
+
+	'''
+	module_name, _, attribute = spec.partition(':')
+	module = importlib.import_module(module_name)
+	return getattr(module, attribute or 'schema')
+
+
+class MalformedRow(object):
+	'''
+	Stands in for a row that could not be read as a record.
+
+	'''
+
+	__slots__ = ('message',)
+
+	code = 'malformed_row'
+
+	def __init__(self, message):
+		self.message = message
+
+
+def read_csv(stream, encoding='utf-8'):
+	reader = csv.DictReader(stream)
+	for row in reader:
+		if None in row:
+			yield MalformedRow('Expected %d fields, got more' % len(reader.fieldnames))
+			continue
+		if None in row.itervalues():
+			yield MalformedRow('Expected %d fields, got fewer' % len(reader.fieldnames))
+			continue
+		try:
+			yield dict((k.decode(encoding), v.decode(encoding)) for k, v in row.iteritems())
+		except UnicodeDecodeError as e:
+			yield MalformedRow('Cannot decode the row: %s' % e)
+
+
+def read_jsonl(stream, encoding='utf-8'):
+	for line in stream:
+		line = line.strip()
+		if not line:
+			continue
+		try:
+			record = json.loads(line, encoding=encoding)
+		except ValueError as e:
+			yield MalformedRow('Invalid JSON: %s' % e)
+			continue
+		if not isinstance(record, dict):
+			yield MalformedRow('Expected a JSON object, got %s' % type(record).__name__)
+			continue
+		yield record
+
+
+def _well_formed(rows, kinds):
+	# passes on records, noting for every row whether it was malformed
+	for row in rows:
+		if isinstance(row, MalformedRow):
+			kinds.append(row)
+		else:
+			kinds.append(None)
+			yield row
+
+
+def _outcomes(rows, validate):
+	'''
+	Yield the result, or the MalformedRow, of every row in input order.
+
+	Only well-formed records are validated, and the malformed rows are put
+	back in their places as the results come in.
+
+	'''
+	kinds = collections.deque()
+	for result in validate(_well_formed(rows, kinds)):
+		kind = kinds.popleft()
+		while kind is not None:
+			yield kind
+			kind = kinds.popleft()
+		yield result
+	for kind in kinds:
+		yield kind
+
+
+READERS = {
+	'csv': read_csv,
+	'jsonl': read_jsonl,
+}
+
+
+def guess_format(path):
+	if path.endswith('.csv'):
+		return 'csv'
+	if path.endswith('.jsonl') or path.endswith('.json'):
+		return 'jsonl'
+	return None
+
+
+def make_parser():
+	parser = argparse.ArgumentParser(prog='konval-validate',
+		description='Validate the rows of a CSV or JSONL file against a konval schema.')
+	parser.add_argument('schema', help='schema to use, as package.module[:name] (name defaults to "schema")')
+	parser.add_argument('path', help='file to validate, or - for standard input')
+	parser.add_argument('-f', '--format', choices=sorted(READERS), help='input format (guessed from the file extension)')
+	parser.add_argument('-p', '--processes', type=int, default=1, help='number of worker processes (default 1)')
+	parser.add_argument('-c', '--chunksize', type=int, default=1000, help='rows per worker task (default 1000)')
+	parser.add_argument('-o', '--failures', help='where to write failing rows (default PATH.failures.jsonl)')
+	parser.add_argument('-e', '--encoding', default='utf-8', help='encoding of CSV input (default utf-8)')
+	return parser
+
+
+def main(argv=None, stdout=None):
+	'''
+	Run konval-validate, returning 0 if every row is valid and 1 otherwise.
+
+	'''
+	parser = make_parser()
+	args = parser.parse_args(argv)
+	stdout = stdout or sys.stdout
+
+	data_format = args.format or guess_format(args.path)
+	if data_format is None:
+		parser.error('cannot guess the format of %s, use --format' % args.path)
+	failures_path = args.failures
+	if failures_path is None:
+		if args.path == '-':
+			parser.error('reading from standard input needs --failures')
+		failures_path = args.path + '.failures.jsonl'
+
+	schema = konval.compile(load_schema(args.schema))
+
+	started = time.time()
+	stream = sys.stdin if args.path == '-' else open(args.path, 'rb')
+	try:
+		rows = READERS[data_format](stream, args.encoding)
+		if args.processes > 1:
+			from konval import parallel
+			results = _outcomes(rows, lambda records: parallel.validate_parallel(schema, records,
+				args.processes, args.chunksize))
+		else:
+			results = _outcomes(rows, lambda records: konval.validate_many(schema, records))
+
+		rows = 0
+		invalid = 0
+		malformed = 0
+		field_failures = {}
+		with open(failures_path, 'wb') as failures:
+			for rows, result in enumerate(results, 1):
+				if isinstance(result, MalformedRow):
+					invalid += 1
+					malformed += 1
+					failures.write(json.dumps({'row': rows, 'code': result.code, 'error': result.message},
+						sort_keys=True) + '\n')
+					continue
+				if result.is_valid():
+					continue
+				invalid += 1
+				errors = result.get_errors()
+				for name in errors:
+					field_failures[name] = field_failures.get(name, 0) + 1
+				failures.write(json.dumps({'row': rows, 'errors': errors}, sort_keys=True) + '\n')
+		elapsed = time.time() - started
+	finally:
+		if stream is not sys.stdin:
+			stream.close()
+
+	rate = rows / elapsed if elapsed > 0 else float(rows)
+	error_rate = 100.0 * invalid / rows if rows else 0.0
+	stdout.write('%d rows in %.2fs (%.0f rows/s)\n' % (rows, elapsed, rate))
+	stdout.write('%d invalid (%.2f%%), failures written to %s\n' % (invalid, error_rate, failures_path))
+	if malformed:
+		stdout.write('  malformed rows: %d (%.2f%%)\n' % (malformed, 100.0 * malformed / rows))
+	for name, count in sorted(field_failures.iteritems(), key=lambda item: -item[1]):
+		stdout.write('  %s: %d (%.2f%%)\n' % (name, count, 100.0 * count / rows))
+
+	return 1 if invalid else 0
+
+
+def read_synonyms(stream, delimiter, json_values, encoding='utf-8'):
+	for row in csv.reader(stream, delimiter=delimiter):
+		if not row or row[0].startswith('#'):
+			continue
+		if len(row) < 2:
+			raise ValueError('Expected a key and a value, got %r' % row)
+		key = row[0].decode(encoding)
+		value = json.loads(row[1]) if json_values else row[1].decode(encoding)
+		yield key, value
+
+
+def build_synonyms(argv=None, stdout=None):
+	'''
+	Run konval-build-synonyms, writing a synonym file from a CSV of pairs.
+
+	'''
+	parser = argparse.ArgumentParser(prog='konval-build-synonyms',
+		description='Build a memory-mapped synonym file from a CSV of key,value rows.')
+	parser.add_argument('source', help='CSV file of key,value rows, or - for standard input')
+	parser.add_argument('output', help='synonym file to write')
+	parser.add_argument('-d', '--delimiter', default=',', help='field delimiter (default ",")')
+	parser.add_argument('-j', '--json-values', action='store_true', help='parse values as JSON, e.g. true or 3')
+	parser.add_argument('-e', '--encoding', default='utf-8', help='encoding of the input (default utf-8)')
+	args = parser.parse_args(argv)
+	stdout = stdout or sys.stdout
+	from konval import vocabulary
+
+	started = time.time()
+	stream = sys.stdin if args.source == '-' else open(args.source, 'rb')
+	try:
+		pairs = read_synonyms(stream, args.delimiter.decode('string_escape'), args.json_values, args.encoding)
+		count = vocabulary.write_synonym_file(args.output, pairs)
+	finally:
+		if stream is not sys.stdin:
+			stream.close()
+	stdout.write('%d synonyms written to %s in %.2fs\n' % (count, args.output, time.time() - started))
+	return 0
+
+
+if __name__ == '__main__':
+	sys.exit(main())
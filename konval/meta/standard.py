@@ -1,14 +1,15 @@
-from ..base import Konvalidator, KonversionError, ValidationError, And, Or, If, IfElse, Default, strings, types
-
-import ipaddress
+from ..base import Konvalidator, KonversionError, ValidationError, And, Or, If, IfElse, Default, network, strings
 
 class IsAlpha(And):
 	''' Accepts only strings with alphabetical characters, spaces, underscores or dashes '''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsAlpha, self).__init__(
 			(
-				types.ToType(unicode),
+				strings.ToString(),
 				strings.IsRegexMatch(r'^[A-Z \-_]+$')
 			),
 			'The specified value "{value}" is not a purely alphabetical string.'
@@ -17,20 +18,26 @@ class IsAlpha(And):
 class IsAlphaNumeric(And):
 	''' Accepts only strings with alphabetical characters, spaces and dashes '''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsAlphaNumeric, self).__init__(
 			(
-				types.ToType(unicode),
+				strings.ToString(),
 				strings.IsRegexMatch(r'^[A-z \-_0-9]+$')
 			),
 			'The specified value "{value}" is not a purely alphanumeric string.'
 		)
 
 class IsEmailAddress(And):
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsEmailAddress, self).__init__(
 			(
-				types.ToType(unicode),
+				strings.ToString(),
 				strings.IsRegexMatch(r'^[a-z0-9\._\+%-]+@[a-z0-9\.-]+(\.[A-Z]{2,4})+$')
 			),
 			'The specified value "{value}" is not a valid email address'
@@ -42,10 +49,13 @@ class IsName(And):
 	no numbers, symbols, or wierd punctuation.
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsName, self).__init__(
 			(
-				types.ToType(unicode),
+				strings.ToString(),
 				strings.IsRegexMatch(r'^[a-z \.]+$')
 			),
 			'The specified value "{value}" is not a valid name.'
@@ -56,12 +66,14 @@ class IsIpv4(And):
 	See if string is a valid IP address
 	'''
 
+	__slots__ = ()
+	interned = True
+
 	def __init__(self):
 		super(IsIpv4, self).__init__(
 			(
-				types.ToType(unicode),
-				strings.IsRegexMatch(r'^([0-9]{1,3}\.){3}[0-9]{1,3}$'),
-				types.ToType(ipaddress.IPv4Address)
+				strings.ToString(),
+				network.ToIpv4Address()
 			),
 			'The specified value "{value}" is not a valid IPV4 address.'
 		)
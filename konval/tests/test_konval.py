@@ -1,7 +1,10 @@
+import pickle
+
+from nose.plugins.skip import SkipTest
 from nose.tools.trivial import assert_equal, assert_true, assert_false, assert_raises, assert_raises_regexp, assert_is_not_none
 
 import konval
-from konval.meta.standard import IsEmailAddress, IsName
+from konval.meta.standard import IsAlpha, IsAlphaNumeric, IsEmailAddress, IsIpv4, IsName
 
 def test_konvalidator():
 	konvalidator = konval.Konvalidator()
@@ -110,4 +113,1038 @@ def test_konval():
 
 	result = konval.validate(test_schema, fail_data)
 	assert_false(result.is_valid())
-	assert_is_not_none(result.get_errors())
\ No newline at end of file
+	assert_is_not_none(result.get_errors())
+
+def test_compile():
+	test_schema = {
+		u'name': IsName(),
+		u'age': [konval.types.IsType(int), konval.numbers.Minimum(18)]
+	}
+
+	compiled = konval.compile(test_schema)
+	assert_true(konval.compile(compiled) is compiled)
+
+	result = compiled.validate({u'name': u'Peter M. Elias', u'age': 37, u'other': 1})
+	assert_true(result.is_valid())
+	assert_equal(result.get_valid(), {u'name': u'Peter M. Elias', u'age': 37})
+
+	result = compiled.validate({u'name': 123, u'age': 12})
+	assert_false(result.is_valid())
+	assert_equal(sorted(result.get_errors().keys()), [u'age', u'name'])
+	assert_equal(len(result.get_errors()[u'age']), 1)
+
+	assert_equal(konval.validate(compiled, {u'age': 12}).get_errors(),
+		konval.validate(test_schema, {u'age': 12}).get_errors())
+
+def test_fail_fast():
+	test_schema = {
+		u'name': IsName(),
+		u'age': [konval.types.IsType(int), konval.numbers.Minimum(18)],
+		u'code': [konval.strings.ToUpper(), konval.strings.LengthRange(2, 4)],
+	}
+	compiled = konval.compile(test_schema)
+
+	result = compiled.validate({u'name': 123, u'age': 'x', u'code': u'abcdef'}, fail_fast=True)
+	assert_false(result.is_valid())
+	assert_equal(len(result.get_errors()), 1)
+	assert_equal(len(result.get_errors().values()[0]), 1)
+	assert_equal(konval.validate(test_schema, {u'age': 12}, fail_fast=True).get_error_codes(),
+		{u'age': ['below_minimum']})
+
+	good = {u'name': u'Ann Smith', u'age': 37, u'code': u'ab'}
+	assert_equal(compiled.validate(good, fail_fast=True).get_valid(), compiled.validate(good).get_valid())
+	assert_true(compiled.check(good))
+	assert_false(compiled.check({u'age': 12}))
+
+	# codes are often too long, so they are checked first, length before case
+	samples = [{u'name': u'Ann Smith', u'age': 37, u'code': u'abcdef'} for _ in range(50)]
+	ordering = compiled.calibrate(samples)
+	assert_equal(ordering[0], (u'code', (1, 0)))
+	assert_equal(sorted(name for name, _ in ordering), [u'age', u'code', u'name'])
+
+	# reordered steps still store the value from the last declared step
+	assert_equal(compiled.validate(good, fail_fast=True).get_valid()[u'code'], u'ab')
+	for record in [good, {u'age': 12}, {u'name': 1, u'code': u'abc'}, {u'code': u'a', u'age': 'x'}]:
+		assert_equal(compiled.check(record), compiled.validate(record).is_valid())
+		assert_equal(compiled.validate(record, fail_fast=True).is_valid(), compiled.validate(record).is_valid())
+
+	compiled.ordering = None
+	assert_true(compiled.check(good))
+
+def test_adaptive():
+	IsType = konval.types.IsType
+	branches = [IsType(str), IsType(float), IsType(int)]
+	declared = konval.Or(branches)
+	adaptive = konval.Or(branches, adaptive=True)
+	assert_equal(adaptive.order, (0, 1, 2))
+	assert_equal(declared.order, (0, 1, 2))
+	assert_raises(ValueError, declared.freeze_order)
+
+	for value in range(1000):
+		assert_equal(adaptive(value), declared(value))
+	assert_equal(adaptive.order[0], 2)
+	for value in ['a', 1.5, 3, None]:
+		assert_equal(adaptive.attempt(value), declared.attempt(value))
+	assert_raises(konval.ValidationError, adaptive, None)
+
+	adaptive.freeze_order([1, 0, 2])
+	for value in range(1000):
+		adaptive(value)
+	assert_equal(adaptive.order, (1, 0, 2))
+	assert_raises(ValueError, adaptive.freeze_order, [0, 0, 1])
+	adaptive.thaw_order()
+	for value in range(1000):
+		adaptive(value)
+	assert_equal(adaptive.order[0], 2)
+
+	# an And learns to try the check that usually fails first
+	checks = [konval.strings.IsRegexMatch(r'^[a-z]+$'), konval.strings.LengthRange(2, 4)]
+	declared = konval.And(checks)
+	adaptive = konval.And(checks, adaptive=True)
+	for value in [u'abcdefg'] * 1000:
+		assert_equal(adaptive.attempt(value), declared.attempt(value))
+	assert_equal(adaptive.order, (1, 0))
+	assert_equal(adaptive(u'abc'), u'abc')
+	for value in [u'abcdefg', u'12', u'AB12345']:
+		with assert_raises(konval.KonvalError) as caught:
+			adaptive(value)
+		assert_equal(caught.exception.code, _error_code(declared, value))
+
+	# a converting step makes an adaptive And run in declared order
+	steps = (konval.strings.ToStripped(), konval.strings.LengthMinimum(3))
+	declared = konval.And(steps)
+	assert_raises(konval.ValidationError, konval.And(steps, adaptive=True), u' a ')
+	adaptive = konval.And(steps, adaptive=True)
+	for value in [u'abcd', u' a ', u'  abcd  ', u'ab']:
+		assert_equal(adaptive.attempt(value), declared.attempt(value))
+	assert_equal(adaptive(u' abc '), u'abc')
+
+	# adaptive instances learn on their own, so they are never interned
+	branches = tuple(branches)
+	first = konval.Or(branches, adaptive=True)
+	second = konval.Or(branches, adaptive=True)
+	assert_true(first is not second)
+	first.freeze_order([2, 1, 0])
+	assert_equal(second.order, (0, 1, 2))
+	assert_true(konval.Or(branches) is konval.Or(branches))
+	checks = tuple(checks)
+	assert_true(konval.And(checks, adaptive=True) is not konval.And(checks, adaptive=True))
+	assert_true(konval.And(checks) is konval.And(checks))
+
+def _error_code(validator, value):
+	try:
+		validator(value)
+	except konval.KonvalError as e:
+		return e.code
+
+def test_vocabulary():
+	import os
+	import tempfile
+
+	terms = [u'E11.9', u'E11.65', u'E10 Type-1', u'J45.909'] + [u'X%06d' % i for i in range(1000)]
+	vocabulary = konval.vocabulary.InVocabulary(terms)
+	assert_equal(len(vocabulary), 1004)
+	assert_true(u'E11.9' in vocabulary)
+	assert_equal(vocabulary(u'E11.9'), u'E11.9')
+	assert_false(vocabulary.check(u'e11.9'))
+	assert_false(vocabulary.check([u'E11.9']))
+	assert_equal(vocabulary.prefix(u'E11'), [u'E11.65', u'E11.9'])
+	assert_equal(vocabulary.prefix(u'X', limit=2), [u'X000000', u'X000001'])
+	assert_equal(vocabulary.prefix(u'Z'), [])
+
+	with assert_raises(konval.ValidationError) as caught:
+		vocabulary(u'nope')
+	assert_equal(caught.exception.code, u'not_in_list')
+	assert_true(len(caught.exception.message) < 200)
+	assert_true('1004 terms' in caught.exception.message)
+
+	# terms may be a generator; errors and pickles are built from the index
+	generated = konval.vocabulary.InVocabulary(term for term in terms)
+	with assert_raises(konval.ValidationError) as caught:
+		generated(u'nope')
+	assert_true('1004 terms' in caught.exception.message)
+	assert_equal(len(pickle.loads(pickle.dumps(generated))), 1004)
+
+	# nor is a list of terms kept alongside the index, or printed in full
+	import weakref
+
+	class Terms(list):
+		pass
+
+	listed = Terms(terms)
+	listed_ref = weakref.ref(listed)
+	from_list = konval.vocabulary.InVocabulary(listed)
+	del listed
+	assert_true(listed_ref() is None)
+	assert_equal(repr(from_list), 'InVocabulary(<1004 terms>, canonical=False)')
+	assert_true(len(repr(konval.vocabulary.InList([u'x'] * 100000))) < 200)
+
+	canonical = konval.vocabulary.InVocabulary(terms, canonical=True)
+	assert_equal(canonical(u' e10 type 1 '), u'E10 Type-1')
+	assert_equal(canonical.attempt(u'j45.909'), (True, u'J45.909'))
+	assert_equal(canonical.attempt(5), konval.FAILED)
+	assert_equal(canonical.prefix(u'e10'), [u'E10 Type-1'])
+
+	handle, path = tempfile.mkstemp()
+	try:
+		with os.fdopen(handle, 'w') as out:
+			out.write('# codes\nE11.9\n\n  J45.909  \n')
+		loaded = konval.vocabulary.InVocabulary.from_file(path)
+		assert_equal(sorted(loaded.terms), [u'E11.9', u'J45.909'])
+		assert_true(loaded.check(u'J45.909'))
+	finally:
+		os.remove(path)
+
+	with assert_raises(konval.ValidationError) as caught:
+		konval.vocabulary.InList(terms)(u'nope')
+	assert_true(len(caught.exception.message) < 200)
+
+def test_synonym_file():
+	import os
+	import shutil
+	import StringIO
+	import tempfile
+	from konval.meta import cli
+
+	directory = tempfile.mkdtemp()
+	try:
+		path = os.path.join(directory, 'yes_no.syn')
+		pairs = [(u'yes', True), ('no', False), (u'n\xe4', False), (u'count', 3), (u'y', u'yes')]
+		pairs += [(u'k%05d' % i, i) for i in range(2000)]
+		mask = os.umask(0o022)
+		try:
+			assert_equal(konval.vocabulary.write_synonym_file(path, pairs), 2005)
+		finally:
+			os.umask(mask)
+		assert_equal(os.stat(path).st_mode & 0o777, 0o644)
+
+		synonyms = konval.vocabulary.SynonymFile(path)
+		assert_equal(len(synonyms), 2005)
+		assert_equal(synonyms[u'yes'], True)
+		assert_equal(synonyms['no'], False)
+		assert_equal(synonyms[u'n\xe4'], False)
+		assert_equal(synonyms[u'k01234'], 1234)
+		assert_equal(synonyms.get(u'maybe', 0), 0)
+		assert_false(5 in synonyms)
+		assert_true(u'k00000' in synonyms)
+		assert_raises(KeyError, lambda: synonyms[u'k99999'])
+
+		to_yes_no = konval.vocabulary.Synonyms(synonyms)
+		assert_equal(to_yes_no(u'y'), u'yes')
+		assert_equal(to_yes_no.attempt(u'maybe'), konval.FAILED)
+		with assert_raises(konval.KonversionError) as caught:
+			to_yes_no(u'maybe')
+		assert_true(len(caught.exception.message) < 200)
+
+		copy = pickle.loads(pickle.dumps(to_yes_no))
+		assert_equal(copy.mapping.path, path)
+		assert_equal(copy(u'count'), 3)
+
+		source = os.path.join(directory, 'pairs.tsv')
+		with open(source, 'w') as out:
+			out.write('# key\tvalue\nyes\ttrue\nno\tfalse\n')
+		stdout = StringIO.StringIO()
+		assert_equal(cli.build_synonyms(['-d', '\\t', '--json-values', source, path], stdout=stdout), 0)
+		assert_true(stdout.getvalue().startswith('2 synonyms'))
+		rebuilt = konval.vocabulary.SynonymFile(path)
+		assert_equal(sorted(rebuilt), [u'no', u'yes'])
+		assert_equal(rebuilt[u'no'], False)
+		# the file opened before the rebuild still reads the old contents
+		assert_equal(synonyms[u'count'], 3)
+		synonyms.close()
+		rebuilt.close()
+
+		assert_raises(ValueError, konval.vocabulary.SynonymFile, source)
+	finally:
+		shutil.rmtree(directory)
+
+def test_containers():
+	containers = konval.containers
+	ToInt = konval.types.ToType(int)
+
+	def numbers(count, bad=()):
+		for i in xrange(count):
+			yield 'x' if i in bad else str(i)
+
+	each = containers.EachItem(ToInt)
+	assert_equal(each(numbers(3)), [0, 1, 2])
+	assert_equal(each.attempt(numbers(3)), (True, [0, 1, 2]))
+	assert_equal(each.attempt(numbers(3, [1])), konval.FAILED)
+	assert_equal(each.attempt(5), konval.FAILED)
+	with assert_raises(konval.ValidationError) as caught:
+		each(numbers(10, [2, 5]))
+	assert_equal(caught.exception.code, 'bad_item')
+	assert_equal(caught.exception.indices, [2])
+
+	with assert_raises(konval.ValidationError) as caught:
+		containers.EachItem(ToInt, fail_fast=False)(numbers(10, [2, 5]))
+	assert_equal(caught.exception.indices, [2, 5])
+	assert_equal(caught.exception.item_errors[5].code, 'conversion')
+	assert_true(caught.exception.message.startswith('2 items are invalid'))
+
+	stream = numbers(5)
+	assert_true(containers.EachItem(ToInt, convert=False)(stream) is stream)
+
+	# early exit: items past the maximum are never read
+	stream = numbers(10 ** 9)
+	list_of = containers.ListOf(ToInt, minimum=1, maximum=3)
+	assert_equal(list_of(numbers(3)), [0, 1, 2])
+	assert_equal(list_of.attempt(stream), konval.FAILED)
+	assert_equal(next(stream), '4')
+	assert_raises(konval.ValidationError, list_of, [])
+	assert_equal(list_of.attempt(iter([])), konval.FAILED)
+
+	dict_of = containers.DictOf(konval.strings.ToLower(), ToInt)
+	assert_equal(dict_of({u'A': '1', u'b': '2'}), {u'a': 1, u'b': 2})
+	assert_equal(dict_of(iter([(u'A', '1')])), {u'a': 1})
+	assert_equal(dict_of.attempt([(u'a', 'x')]), konval.FAILED)
+	with assert_raises(konval.ValidationError) as caught:
+		containers.DictOf(value_validator=ToInt, fail_fast=False)([(u'a', 'x'), 5, (u'c', '3'), (u'd', 'y')])
+	assert_equal(caught.exception.indices, [u'a', 1, u'd'])
+
+	# lazy lengths are counted only as far as needed
+	stream = numbers(10 ** 9)
+	assert_equal(containers.LengthRange(1, 5).attempt(stream), konval.FAILED)
+	assert_equal(next(stream), '6')
+	assert_equal(containers.LengthRange(1, 5)(numbers(3)), ['0', '1', '2'])
+	assert_equal(list(containers.LengthRange(2)(numbers(4))), ['0', '1', '2', '3'])
+	assert_raises(konval.ValidationError, containers.LengthRange(2, 3), numbers(4))
+	assert_raises(konval.ValidationError, containers.LengthRange(2), numbers(1))
+	assert_equal(containers.LengthRange(1, 5)([1, 2]), [1, 2])
+
+def test_bytes_input():
+	strings = konval.strings
+	raw = bytearray(b'Peter M. Elias')
+	view = memoryview(raw)
+
+	for value in [b'Peter M. Elias', raw, view]:
+		assert_true(IsName()(value) is value)
+		assert_true(strings.IsRegexMatch(r'^[a-z .]+$').check(value))
+		assert_true(strings.RegexSet([r'^[0-9]+$', r'^[a-z .]+$']).which(value) == 1)
+		assert_equal(strings.LengthRange(2, 20).attempt(value), (True, value))
+		assert_false(strings.LengthMaximum(4).check(value))
+		assert_true(konval.containers.LengthRange(14, 14).check(value))
+	assert_false(IsAlpha().check(memoryview(b'abc123')))
+	assert_true(IsAlphaNumeric().check(memoryview(b'abc123')))
+	assert_false(IsEmailAddress().check(bytearray(b'not an address')))
+
+	address = IsIpv4()(memoryview(b'192.168.0.1'))
+	assert_equal(str(address), '192.168.0.1')
+	assert_equal(IsIpv4()(bytearray(b'10.0.0.1')), IsIpv4()(u'10.0.0.1'))
+
+	assert_equal(strings.ToString()(123), u'123')
+	assert_true(strings.ToString()(view) is view)
+	assert_equal(strings.ToDecoded()(view), u'Peter M. Elias')
+	assert_equal(strings.ToDecoded()(bytearray(b'caf\xc3\xa9')), u'caf\xe9')
+	assert_equal(strings.ToDecoded('ascii').attempt(b'caf\xc3\xa9'), konval.FAILED)
+	assert_equal(strings.ToDecoded().attempt(5), konval.FAILED)
+
+def test_codegen():
+	import shutil
+	import tempfile
+	codegen = konval.codegen
+	numbers, strings, types, vocabulary = konval.numbers, konval.strings, konval.types, konval.vocabulary
+
+	class IsEven(konval.Konvalidator):
+		def validate_value(self, value):
+			if not isinstance(value, int) or value % 2:
+				raise konval.ValidationError('%r is not even', value, code='odd')
+			return True
+
+	test_schema = {
+		u'name': IsName(),
+		u'age': konval.And((types.ToType(int), numbers.Range(13, 120))),
+		u'score': [types.IsInstance([int, float]), numbers.Between(0, 10), IsEven()],
+		u'code': konval.Or((types.IsType(int), konval.Default(strings.LengthBetween(1, 4), u'none'))),
+		u'colour': [strings.ToLower(), vocabulary.InList([u'red', 'green'])],
+		u'tag': konval.Or((strings.IsRegexMatch(r'^[a-z]+$'), strings.IsRegexMatch(r'^[0-9]+$')), adaptive=True),
+		u'size': strings.LengthMinimum(2),
+		u'level': numbers.Minimum(1),
+	}
+	records = [
+		{u'name': u'Ann Smith', u'age': '37', u'score': 4, u'code': 5, u'colour': u'red', u'tag': u'abc', u'size': u'ab',
+			u'level': 3},
+		{u'name': 123, u'age': 'x', u'score': 3, u'code': u'abcdef', u'colour': u'Blue', u'tag': u'7', u'size': u'a'},
+		{u'age': '12', u'score': 12, u'code': u'ab', u'colour': u'green', u'tag': u'a1', u'other': 1},
+		{u'score': 'x', u'code': u'', u'tag': u'-', u'colour': 5},
+		{u'level': float('nan')},
+		{},
+	]
+	compiled = konval.compile(test_schema)
+	assert_true(compiled.validate(records[0]).is_valid())
+	directory = tempfile.mkdtemp()
+	try:
+		generated = codegen.generate_schema(test_schema, cache_dir=directory)
+		assert_true(generated.source_path.startswith(directory))
+		assert_true(konval.compile(generated) is generated)
+		for record in records:
+			expected = compiled.validate(record)
+			result = generated.validate(record)
+			assert_equal(result.get_valid(), expected.get_valid())
+			assert_equal(result.get_errors(), expected.get_errors())
+			assert_equal(result.get_error_codes(), expected.get_error_codes())
+			assert_equal(generated.validate(record, fail_fast=True).is_valid(), expected.is_valid())
+			assert_equal(generated.check(record), expected.is_valid())
+
+		# a warm start loads the cached module without generating it again
+		generate = codegen.generate
+		codegen.generate = None
+		try:
+			warm = codegen.GeneratedSchema(test_schema, cache_dir=directory)
+		finally:
+			codegen.generate = generate
+		assert_equal(warm.source_path, generated.source_path)
+		assert_equal(warm.validate(records[0]).get_valid(), compiled.validate(records[0]).get_valid())
+
+		# settings are read when loading, so only the shape of the schema matters
+		other = dict(test_schema, age=konval.And((types.ToType(int), numbers.Range(50, 60))))
+		assert_equal(codegen.fingerprint(other), codegen.fingerprint(test_schema))
+		assert_false(codegen.GeneratedSchema(other, cache_dir=directory).validate(records[0]).is_valid())
+		assert_true(codegen.fingerprint({u'age': numbers.Between(1, 2)}) != codegen.fingerprint({u'age': numbers.Range(1, 2)}))
+
+		in_memory = codegen.GeneratedSchema(test_schema, cache_dir=False)
+		assert_true(in_memory.source_path is None)
+		assert_equal(in_memory.validate(records[1]).get_errors(), compiled.validate(records[1]).get_errors())
+	finally:
+		shutil.rmtree(directory)
+
+IMPORT_BUDGET = 0.1
+
+def test_import_time():
+	import os
+	import subprocess
+	import sys
+
+	script = ('import sys, time; start = time.time(); import konval.meta.standard; '
+		'print time.time() - start; print " ".join(sys.modules)')
+	root = os.path.dirname(os.path.dirname(os.path.abspath(konval.__file__)))
+	timings = []
+	for _ in range(3):
+		output = subprocess.check_output([sys.executable, '-c', script], cwd=root)
+		elapsed, modules = output.splitlines()
+		timings.append(float(elapsed))
+	assert_true(min(timings) < IMPORT_BUDGET, 'importing konval took %.3fs' % min(timings))
+	for heavy in ['multiprocessing', 'json', 'mmap', 'hashlib', 'ipaddress', 'konval.base.parallel']:
+		assert_false(heavy in modules.split(), '%s was imported' % heavy)
+
+	assert_true(konval.parallel is sys.modules['konval.base.parallel'])
+	assert_true('vocabulary' in dir(konval))
+	assert_raises(AttributeError, getattr, konval, 'nonexistent')
+
+def test_network():
+	import random
+	import ipaddress
+	network = konval.network
+
+	def reference(cls, text):
+		try:
+			return int(cls(text))
+		except ValueError:
+			return None
+
+	rng = random.Random(1)
+	samples = [u'0.0.0.0', u'255.255.255.255', u'01.2.3.004', u'1.2.3.256', u'1.2.3', u'1.2.3.4.5', u'1..3.4',
+		u'1.2.3.4 ', u'1.2.3.1234', u'a.b.c.d', u'', u'::', u'::1', u'1::', u'1:2:3:4:5:6:7:8', u'1:2:3:4:5:6:7::',
+		u'::ffff:1.2.3.4', u'1::2::3', u'12345::', u'fe80::1%eth0', u':1::', u'1:2:3:4:5:6:1.2.3.4',
+		u'1:2:3:4:5:6:7:1.2.3.4', u'::1.2.3.4', u'1:2:3:4:5:6:7:8:9', u'1::2:3:4:5:6:7', u'1::2:3:4:5:6:7:8',
+		u'::0001:2', u'1:', u':', u'1:2', u'::g', u'::1.2.3', u'010.1.1.1', u'08.0.0.1', u'07.0.0.1', u'00.0.0.1',
+		u'::ffff:010.1.1.1', u'::ffff:07.1.1.1']
+	for _ in range(3000):
+		samples.append(u''.join(rng.choice(u'0123456789abcdef.:') for _ in range(rng.randint(1, 20))))
+		samples.append(u'.'.join(str(rng.randint(0, 300)) for _ in range(4)))
+	for text in samples:
+		assert_equal(network.parse_ipv4(text), reference(ipaddress.IPv4Address, text), text)
+		assert_equal(network.parse_ipv6(text), reference(ipaddress.IPv6Address, text), text)
+
+	assert_equal(network.IsIpv4Address()(b'10.0.0.1'), b'10.0.0.1')
+	assert_equal(network.ToIpv4Address()(memoryview(b'10.0.0.1')), ipaddress.IPv4Address(u'10.0.0.1'))
+	assert_equal(network.ToIpv6Address().attempt(bytearray(b'::1')), (True, ipaddress.IPv6Address(u'::1')))
+	assert_equal(network.IsIpv6Address().attempt(5), konval.FAILED)
+	with assert_raises(konval.ValidationError) as caught:
+		network.IsIpv4Address()(u'1.2.3.999')
+	assert_equal(caught.exception.code, 'not_ip_address')
+	assert_equal(IsIpv4()(u'10.0.0.1'), ipaddress.IPv4Address(u'10.0.0.1'))
+	assert_false(IsIpv4().check(u'10.0.0.1\n'))
+	assert_false(IsIpv4().check(u'010.1.1.1'))
+
+	assert_true(network.IsIpv4Network().check(u'10.0.0.0/8'))
+	assert_true(network.IsIpv4Network().check(u'10.1.2.3'))
+	assert_false(network.IsIpv4Network().check(u'10.0.0.1/8'))
+	assert_true(network.IsIpv4Network(strict=False).check(u'10.0.0.1/8'))
+	assert_false(network.IsIpv4Network().check(u'10.0.0.0/33'))
+	assert_false(network.IsIpv4Network().check(u'10.0.0.0/'))
+	assert_true(network.IsIpv6Network().check(b'2001:db8::/32'))
+	assert_false(network.IsIpv6Network().check(u'2001:db8::1/32'))
+	assert_raises(konval.ValidationError, network.IsIpv6Network(), u'2001:db8::/129')
+
+	try:
+		import numpy
+	except ImportError:
+		raise SkipTest('numpy is not installed')
+	packed, valid = network.IsIpv4Address().pack([u'10.0.0.1', b'nope', bytearray(b'255.255.255.255'), None])
+	assert_equal(packed.dtype, numpy.uint32)
+	assert_equal(packed.tolist(), [167772161, 0, 4294967295, 0])
+	assert_equal(valid.tolist(), [True, False, True, False])
+	packed, valid = network.IsIpv6Address().pack([u'::1', u'ffff::', u'bad'])
+	assert_equal(packed.shape, (3, 2))
+	assert_equal(packed.dtype, numpy.uint64)
+	assert_equal(packed.tolist(), [[0, 1], [0xffff << 48, 0], [0, 0]])
+	assert_equal(valid.tolist(), [True, True, False])
+	packed, valid = network.IsIpv6Address().pack([])
+	assert_equal(packed.shape, (0, 2))
+
+def test_result_set():
+	test_schema = {
+		u'name': IsName(),
+		u'age': konval.And((konval.types.ToType(int), konval.numbers.Range(13, 120))),
+		u'tags': [konval.types.IsType(list), konval.containers.LengthRange(1, 3)],
+	}
+	records = []
+	for i in range(100):
+		record = {u'name': u'Ann Smith', u'age': str(20 + i)}
+		if i % 10 == 3:
+			record[u'name'] = u'R2D2'
+		if i % 25 == 0:
+			record[u'tags'] = 5
+		if i == 7:
+			record[u'age'] = 'x'
+		records.append(record)
+	expected = list(konval.validate_many(test_schema, records))
+
+	results = konval.resultset.ResultSet.collect(test_schema, records)
+	assert_equal(len(results), 100)
+	assert_equal(results.failure_counts(), {u'name': 10, u'age': 1, u'tags': 4})
+	assert_equal(results.code_counts(u'tags'), {u'not_type': 4})
+	assert_equal(results.code_counts()[u'no_match'], 10)
+	assert_equal(results.first_failures(u'name', 3), [3, 13, 23])
+	assert_equal(results.first_failures(u'tags'), [0, 25, 50, 75])
+	invalid = [i for i, result in enumerate(expected) if not result.is_valid()]
+	assert_equal(list(results.invalid_rows()), invalid)
+	assert_equal(results.invalid_count(), len(invalid))
+	for row in [0, 3, 5, 7, 99]:
+		rebuilt = results.result(row)
+		assert_equal(rebuilt.is_valid(), expected[row].is_valid())
+		assert_equal(results.is_valid(row), expected[row].is_valid())
+		assert_equal(rebuilt.get_error_codes(), expected[row].get_error_codes())
+		assert_equal(rebuilt.get_valid(), {})
+	assert_raises(IndexError, results.result, 100)
+
+	results = konval.resultset.ResultSet(test_schema, keep_messages=True, keep_values=True)
+	results.extend(expected)
+	for row in range(100):
+		rebuilt = results.result(row)
+		assert_equal(rebuilt.get_errors(), expected[row].get_errors())
+		for name, errors in expected[row].errors.iteritems():
+			assert_equal([e.__class__ for e in rebuilt.errors[name]], [e.__class__ for e in errors])
+		valid = expected[row].get_valid()
+		for name in expected[row].errors:
+			valid.pop(name, None)
+		assert_equal(rebuilt.get_valid(), valid)
+
+def test_revalidate():
+	test_schema = {
+		u'name': IsName(),
+		u'age': konval.And((konval.types.ToType(int), konval.numbers.Range(13, 120))),
+		u'email': konval.types.IsType(unicode),
+	}
+	compiled = konval.compile(test_schema)
+	record = {u'name': u'Ann Smith', u'age': '30', u'email': 5}
+	result = compiled.validate(record)
+	errors = result.errors
+	email_errors = errors[u'email']
+
+	result = compiled.revalidate(result, {u'name': u'R2D2', u'age': '40'})
+	record.update({u'name': u'R2D2', u'age': '40'})
+	expected = compiled.validate(record)
+	assert_equal(result.get_error_codes(), expected.get_error_codes())
+	assert_equal(result.get_valid(), expected.get_valid())
+	assert_equal(result.successes[u'age'], 40)
+	# unchanged fields keep their entries
+	assert_true(result.errors is errors)
+	assert_true(result.errors[u'email'] is email_errors)
+
+	result = konval.revalidate(test_schema, result, {u'name': u'Ann Smith', u'other': 1}, removed=[u'email'])
+	assert_true(result.is_valid())
+	assert_equal(result.get_valid(), {u'name': u'Ann Smith', u'age': 40})
+
+def test_validate_many():
+	test_schema = {u'age': [konval.types.IsType(int), konval.numbers.Minimum(18)]}
+
+	records = ({u'age': age} for age in [20, 5, 30, 'old', 40, 1])
+
+	results = konval.validate_many(test_schema, records)
+	assert_equal([r.is_valid() for r in results], [True, False, True, False, True, False])
+
+	records = ({u'age': age} for age in [20, 5, 30, 'old', 40, 1])
+	failures = list(konval.validate_many(test_schema, records, failures_only=True, max_errors=2))
+	assert_equal([r.errors.keys() for r in failures], [[u'age'], [u'age']])
+	assert_equal(len(failures), 2)
+
+def test_pickle():
+	validators = [
+		konval.Or((konval.types.IsType(str), konval.numbers.Range(1, 5))),
+		konval.Or(v for v in [konval.types.IsType(str), konval.numbers.Range(1, 5)]),
+		konval.And((konval.types.ToType(int), konval.numbers.Between(1, 5)), 'Bad {value}'),
+		konval.If(True, konval.strings.ToLower()),
+		konval.IfElse(konval.types.IsType(str), konval.types.ToType(str)),
+		konval.Default(konval.types.IsInstance([int]), 0),
+		konval.Constant(1),
+		konval.strings.IsRegexMatch(r'^[a-z]+$'),
+		konval.strings.ToCanonical(),
+		konval.containers.LengthRange(1, 3),
+		konval.vocabulary.InList(['a', 'b']),
+		konval.vocabulary.Synonyms({'a': 'b'}),
+		IsAlpha(), IsAlphaNumeric(), IsEmailAddress(), IsIpv4(), IsName(),
+	]
+
+	for validator in validators:
+		for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+			copy = pickle.loads(pickle.dumps(validator, protocol))
+			assert_true(type(copy) is type(validator))
+
+	copy = pickle.loads(pickle.dumps(IsName()))
+	assert_equal(copy('Peter M. Elias'), u'Peter M. Elias')
+	assert_false(konval.quick(copy, 'Peter 123'))
+
+	either = konval.Or(v for v in [konval.types.IsType(str), konval.types.IsType(int)])
+	copy = pickle.loads(pickle.dumps(either))
+	assert_equal(copy(3), 3)
+	assert_raises(konval.ValidationError, copy, 1.5)
+	assert_equal(repr(either), "Or((IsType(<type 'str'>), IsType(<type 'int'>)))")
+	assert_true(pickle.loads(pickle.dumps(konval.Or((IsName(),), adaptive=True))).adaptive is not None)
+
+def test_validate_parallel():
+	test_schema = {
+		u'name': IsName(),
+		u'age': konval.And((konval.types.ToType(int), konval.numbers.Minimum(18)))
+	}
+
+	records = [{u'name': u'Peter M. Elias', u'age': str(i)} for i in range(50)]
+	records[3][u'name'] = 123
+
+	results = list(konval.parallel.validate_parallel(test_schema, iter(records), processes=2, chunksize=7))
+	assert_equal(len(results), 50)
+	assert_equal([r.is_valid() for r in results], [i >= 18 and i != 3 for i in range(50)])
+	assert_equal([r.get_value(u'age') for r in results[18:]], range(18, 50))
+	assert_true(results[0].schema is test_schema)
+
+def test_validate_array():
+	try:
+		import numpy
+	except ImportError:
+		raise SkipTest('numpy is not installed')
+	import warnings
+
+	values = numpy.array([-2.0, 0.0, 1.0, 2.5, 5.0, 7.0, float('nan')])
+
+	validators = [
+		konval.numbers.Range(1, 5),
+		konval.numbers.Minimum(1),
+		konval.numbers.Maximum(5),
+		konval.numbers.Between(1, 5),
+		konval.numbers.IsEqual(5.0),
+		konval.numbers.IsZero(),
+	]
+
+	for validator in validators:
+		with warnings.catch_warnings(record=True) as caught:
+			warnings.simplefilter('always')
+			passed, failures = validator.validate_array(values)
+		assert_equal(caught, [])
+		assert_equal(list(passed), [konval.quick(validator, v) for v in values])
+		assert_equal(list(failures), [i for i, v in enumerate(values) if not konval.quick(validator, v)])
+
+	assert_equal(list(konval.numbers.Between(1, 5).mask([1, 2, 5])), [False, True, False])
+
+	# NaN is a missing reading, not a value within bounds, so bounded checks fail it
+	for validator in validators[:4]:
+		assert_equal(list(validator.mask([float('nan'), 3.0])), [False, True])
+	assert_equal(list(konval.numbers.Range().mask([float('nan')])), [True])
+
+def test_error_details():
+	validator = konval.numbers.Range(1, 5)
+
+	try:
+		validator(7)
+	except konval.ValidationError as e:
+		assert_equal(e.code, 'above_maximum')
+		assert_true(e.validator is validator)
+		assert_equal(e.value, 7)
+		assert_true(e._message is None)
+		assert_equal(e.message, 'The specified value 7 is above the required maximum 5')
+		assert_equal(str(e), e.message)
+
+	and_validator = konval.And((konval.types.ToType(int), validator), 'Bad number {value}.')
+	with assert_raises_regexp(konval.KonvalError, 'Bad number 7.'):
+		and_validator('7')
+
+	error = konval.ValidationError('%r is bad', 'x', code='bad', validator=validator, value='x')
+	copy = pickle.loads(pickle.dumps(error))
+	assert_equal((copy.message, copy.code, copy.value, copy.validator), ("'x' is bad", 'bad', 'x', None))
+
+	result = konval.validate({u'age': validator}, {u'age': 3, u'other': 9})
+	assert_true(result.is_valid())
+	result = konval.validate({u'age': validator}, {u'age': 9})
+	assert_equal(result.get_error_codes(), {u'age': ['above_maximum']})
+	assert_equal(result.get_errors(), {u'age': ['The specified value 9 is above the required maximum 5']})
+
+	# NaN is not within any bounds
+	result = konval.validate({u'age': validator, u'ratio': konval.numbers.Between(0.5, 2)},
+		{u'age': float('nan'), u'ratio': float('nan')})
+	assert_equal(result.get_error_codes(), {u'age': ['not_a_number'], u'ratio': ['not_a_number']})
+	assert_false(konval.numbers.Minimum(1).check(float('nan')))
+	assert_true(konval.numbers.Range().check(float('nan')))
+
+	with assert_raises_regexp(konval.ValidationError, 'not within lower bound 1'):
+		konval.strings.LengthBetween(1, 3)('a')
+
+def test_attempt():
+	validators = [
+		konval.Konvalidator(),
+		konval.Or((konval.types.IsType(str), konval.numbers.Range(1, 5))),
+		konval.And((konval.types.ToType(int), konval.numbers.Between(1, 5)), 'Bad {value}'),
+		konval.If(True, konval.types.ToType(int)),
+		konval.IfElse(konval.types.IsType(str), konval.types.ToType(str)),
+		konval.Default(konval.types.IsInstance([int]), 0),
+		konval.Constant(1),
+		konval.numbers.Minimum(2), konval.numbers.Maximum(2), konval.numbers.IsZero(),
+		konval.strings.IsNonBlank(), konval.strings.ToStripped(), konval.strings.ToLower(),
+		konval.strings.ToUpper(), konval.strings.ToCanonical(), konval.strings.ToSlug(),
+		konval.strings.IsRegexMatch(r'^[a-z]+$'),
+		konval.strings.LengthMinimum(2), konval.strings.LengthMaximum(2), konval.strings.LengthBetween(1, 3),
+		konval.types.IsType([int, str]),
+		konval.containers.ToLength(), konval.containers.LengthRange(1, 3),
+		konval.containers.IsEmpty(), konval.containers.IsNotEmpty(),
+		konval.vocabulary.InList(['a', 'b']),
+		konval.vocabulary.Synonyms({'a': 'b', 2: 3}),
+		IsAlpha(), IsAlphaNumeric(), IsEmailAddress(), IsIpv4(), IsName(),
+	]
+	values = [0, 2, 3, 7, '', 'a', ' Ab-C d ', 'abcd', 'me@example.com', '10.0.0.1', u'Peter M. Elias', [], [1, 2], None]
+
+	for validator in validators:
+		for value in values:
+			try:
+				expected = (True, validator(value))
+			except konval.KonvalError:
+				expected = konval.FAILED
+			except Exception as e:
+				with assert_raises(type(e)):
+					validator.attempt(value)
+				continue
+			assert_equal(validator.attempt(value), expected)
+			assert_equal(validator.check(value), expected[0])
+			assert_equal(konval.quick(validator, value), expected[0])
+
+	# Or takes any iterable of validators, as it did before attempt
+	for branches in [set([konval.types.IsType(str)]), (v for v in [konval.types.IsType(str), konval.types.IsType(int)])]:
+		either = konval.Or(branches)
+		assert_equal(either('a'), 'a')
+		assert_equal(either.attempt('b'), (True, 'b'))
+		assert_raises(konval.ValidationError, either, 1.5)
+
+def test_attempt_override():
+	class IsOdd(konval.numbers.Range):
+		def validate_value(self, value):
+			if value % 2 == 0:
+				raise konval.ValidationError('%s is even', value)
+			return True
+
+	assert_false(IsOdd(1, 5).check(4))
+	assert_true(IsOdd(1, 5).check(3))
+	assert_true(konval.Or((konval.types.IsType(str), lambda value: value)).check(3))
+
+def test_regex_set():
+	patterns = [r'^[0-9]{3}-[0-9]{4}$', r'^(AB|CD)([0-9]+)$', r'^x+$', r'^[a-z]+$']
+	regex_set = konval.strings.RegexSet(patterns)
+	or_validator = konval.Or([konval.strings.IsRegexMatch(p) for p in patterns])
+
+	values = ['123-4567', 'ab99', 'CD1', 'xxx', 'hello', '12-34', '', 'AB']
+	for value in values:
+		assert_equal(regex_set.check(value), or_validator.check(value))
+
+	assert_equal([regex_set.which(v) for v in values], [0, 1, 1, 2, 3, None, None, 3])
+	assert_equal(regex_set('ab99'), 'ab99')
+
+	with assert_raises(konval.ValidationError):
+		regex_set('12-34')
+
+def test_cached():
+	calls = []
+
+	def to_int(value):
+		calls.append(value)
+		try:
+			return int(value)
+		except ValueError:
+			raise konval.KonversionError('%r is not a number', value, code='conversion')
+
+	cached = konval.caching.Cached(to_int, maxsize=2)
+
+	assert_equal(cached('1'), 1)
+	assert_equal(cached('1'), 1)
+	assert_true(cached.check('1'))
+	assert_equal(len(calls), 1)
+
+	with assert_raises_regexp(konval.KonversionError, "'x' is not a number"):
+		cached('x')
+	assert_false(cached.check('x'))
+	assert_equal(len(calls), 2)
+
+	assert_equal(cached(u'1'), 1)
+	assert_equal(cached.attempt(2), (True, 2))
+	assert_equal(cached.stats(), {'hits': 3, 'misses': 4, 'evictions': 2, 'size': 2, 'maxsize': 2})
+
+	cached_length = konval.caching.Cached(konval.containers.ToLength())
+	assert_equal(cached_length([1, 2]), 2)
+	assert_equal(cached_length.stats()['size'], 0)
+
+	copy = pickle.loads(pickle.dumps(konval.caching.Cached(IsName(), 10, 'lfu')))
+	assert_equal((copy.maxsize, copy.policy, copy.stats()['size']), (10, 'lfu', 0))
+
+	calls[:] = []
+	cached = konval.caching.Cached(to_int, maxsize=2, policy='lfu')
+	for value in ['1', '1', '2', '3', '1', '2']:
+		cached(value)
+	assert_equal(calls, ['1', '2', '3', '2'])
+	assert_equal(cached.stats()['evictions'], 2)
+
+	schema = konval.caching.cache_schema({u'age': [to_int, konval.numbers.Minimum(18)]})
+	assert_true(konval.validate(schema, {u'age': 20}).is_valid())
+	assert_equal(schema[u'age'][0].stats()['misses'], 1)
+
+def test_interned():
+	assert_true(IsName() is IsName())
+	assert_true(konval.numbers.Range(1, 5) is konval.numbers.Range(1, 5))
+	assert_true(konval.numbers.Range(1, 5) is not konval.numbers.Range(1, 6))
+	assert_true(konval.numbers.IsEqual(1) is not konval.numbers.IsEqual(1.0))
+	assert_true(konval.numbers.Range(minimum=1) is konval.numbers.Range(minimum=1))
+	assert_true(pickle.loads(pickle.dumps(IsName())) is IsName())
+
+	in_list = konval.vocabulary.InList(['a', 'b'])
+	assert_true(in_list is not konval.vocabulary.InList(['a', 'b']))
+	assert_true(pickle.loads(pickle.dumps(in_list)).check('a'))
+
+	for validator in [konval.numbers.Range(1, 5), IsName(), in_list, konval.strings.ToLower()]:
+		assert_false(hasattr(validator, '__dict__'))
+		with assert_raises(AttributeError):
+			validator.minimum = 3
+
+	class Counter(konval.Konvalidator):
+		def __init__(self):
+			self.count = 0
+
+		def validate_value(self, value):
+			self.count += 1
+			return True
+
+	counter = Counter()
+	assert_true(counter is not Counter())
+	counter(1)
+	assert_equal(counter.count, 1)
+
+	class CountingRange(konval.numbers.Range):
+		def validate_value(self, value):
+			self.n = getattr(self, 'n', 0) + 1
+			return super(CountingRange, self).validate_value(value)
+
+	counting = CountingRange(1, 5)
+	assert_true(counting is not CountingRange(1, 5))
+	counting(3)
+	counting(4)
+	assert_equal(counting.n, 2)
+	assert_raises(konval.KonvalError, counting, 9)
+
+def test_validate_concurrent():
+	test_schema = konval.compile({
+		u'name': IsName(),
+		u'age': konval.And((konval.types.ToType(int), konval.numbers.Minimum(18)), 'Too young: {value}')
+	})
+
+	records = [{u'name': u'Peter M. Elias' if i % 7 else 12, u'age': str(i)} for i in range(500)]
+	expected = [(r.get_valid(), r.get_errors()) for r in konval.validate_many(test_schema, records)]
+
+	results = konval.parallel.validate_concurrent(test_schema, iter(records), max_workers=8, chunksize=3)
+	assert_equal([(r.get_valid(), r.get_errors()) for r in results], expected)
+
+def test_validate_async():
+	import threading
+	import time
+
+	class FakeBackend(object):
+		def __init__(self, taken, delay):
+			self.taken = taken
+			self.delay = delay
+			self.lock = threading.Lock()
+			self.active = 0
+			self.peak = 0
+
+		def lookup(self, value):
+			with self.lock:
+				self.active += 1
+				self.peak = max(self.peak, self.active)
+			time.sleep(self.delay)
+			with self.lock:
+				self.active -= 1
+			return value in self.taken
+
+	class IsUnused(konval.Konvalidator):
+		io_bound = True
+
+		def __init__(self, backend):
+			self.backend = backend
+
+		def validate_value(self, value):
+			if self.backend.lookup(value):
+				raise konval.ValidationError('%r is already taken', value, code='taken')
+			return True
+
+	backend = FakeBackend(set(['peter', 'pma@agapow.net']), 0.05)
+	test_schema = {
+		u'login': IsUnused(backend),
+		u'email': [IsEmailAddress(), IsUnused(backend)],
+		u'nick': konval.And((konval.strings.ToLower(), IsUnused(backend))),
+		u'age': konval.types.IsType(int),
+	}
+
+	result = konval.parallel.validate_async(test_schema,
+		{u'login': 'peter', u'email': 'pma@agapow.net', u'nick': 'Pete', u'age': 'x'})
+	assert_equal(backend.peak, 3)
+	assert_equal(result.get_error_codes(), {u'login': ['taken'], u'email': ['taken'], u'age': ['not_type']})
+	assert_equal(result.get_value(u'nick'), 'pete')
+
+	backend.peak = 0
+	result = konval.parallel.validate_async(test_schema, {u'login': 'a', u'email': 'b@c.com', u'nick': 'd'}, max_concurrency=1)
+	assert_equal(backend.peak, 1)
+	assert_true(result.is_valid())
+
+	slow_backend = FakeBackend(set(), 0.5)
+	started = time.time()
+	result = konval.parallel.validate_async({u'login': IsUnused(slow_backend)}, {u'login': 'a'}, timeout=0.05)
+	assert_true(time.time() - started < 0.4)
+	assert_equal(result.get_error_codes(), {u'login': ['timeout']})
+
+	# the pool is kept between calls, so each costs little more than the lookups
+	fast_backend = FakeBackend(set(['peter']), 0)
+	fast_schema = {u'login': IsUnused(fast_backend), u'nick': IsUnused(fast_backend)}
+	started = time.time()
+	for _ in range(50):
+		result = konval.validate_async(fast_schema, {u'login': 'peter', u'nick': 'pete'})
+	assert_true(time.time() - started < 1)
+	assert_equal(result.get_error_codes(), {u'login': ['taken']})
+
+	from multiprocessing.pool import ThreadPool
+	pool = ThreadPool(2)
+	try:
+		result = konval.validate_async(fast_schema, {u'login': 'pete'}, pool=pool)
+		assert_true(result.is_valid())
+	finally:
+		pool.terminate()
+
+def test_cli():
+	import json
+	import os
+	import shutil
+	import sys
+	import tempfile
+	from StringIO import StringIO
+	from konval.meta import cli
+
+	directory = tempfile.mkdtemp()
+	try:
+		with open(os.path.join(directory, 'people_schema.py'), 'w') as module:
+			module.write('import konval\nfrom konval.meta.standard import IsName\n'
+				'people = {u"name": IsName(), u"age": konval.And((konval.types.ToType(int), konval.numbers.Minimum(18)))}\n')
+		with open(os.path.join(directory, 'people.csv'), 'w') as data:
+			data.write('name,age\nPeter M. Elias,37\nR2D2,40\nAnn,12\n')
+		with open(os.path.join(directory, 'people.jsonl'), 'w') as data:
+			data.write('{"name": "Peter M. Elias", "age": 37}\n\n{"name": "Ann", "age": 20}\n')
+
+		sys.path.insert(0, directory)
+		try:
+			output = StringIO()
+			path = os.path.join(directory, 'people.csv')
+			assert_equal(cli.main(['people_schema:people', path], output), 1)
+			assert_true(output.getvalue().startswith('3 rows in '))
+			assert_true('2 invalid (66.67%)' in output.getvalue())
+
+			with open(path + '.failures.jsonl') as failures:
+				rows = [json.loads(line) for line in failures]
+			assert_equal([r['row'] for r in rows], [2, 3])
+			assert_equal(rows[0]['errors'].keys(), [u'name'])
+
+			output = StringIO()
+			path = os.path.join(directory, 'people.jsonl')
+			assert_equal(cli.main(['people_schema:people', path, '--processes', '2'], output), 0)
+			assert_true(output.getvalue().startswith('2 rows in '))
+
+			# malformed rows are reported as failures rather than ending the run
+			path = os.path.join(directory, 'dirty.csv')
+			with open(path, 'w') as data:
+				data.write('name,age\nPeter M. Elias,37\nR2D2\nAnn Smith,40\nBob Jones,50,extra\n')
+			for processes in ['1', '2']:
+				output = StringIO()
+				assert_equal(cli.main(['people_schema:people', path, '-p', processes, '-c', '1'], output), 1)
+				assert_true('4 rows in ' in output.getvalue())
+				assert_true('2 invalid (50.00%)' in output.getvalue())
+				assert_true('malformed rows: 2' in output.getvalue())
+				with open(path + '.failures.jsonl') as failures:
+					rows = [json.loads(line) for line in failures]
+				assert_equal([(r['row'], r['code']) for r in rows], [(2, 'malformed_row'), (4, 'malformed_row')])
+
+			path = os.path.join(directory, 'dirty.jsonl')
+			with open(path, 'w') as data:
+				data.write('{"name": "Peter M. Elias", "age": 37}\nnot json\n[1, 2]\n{"name": "R2D2", "age": 40}\n')
+			output = StringIO()
+			assert_equal(cli.main(['people_schema:people', path], output), 1)
+			assert_true('3 invalid (75.00%)' in output.getvalue())
+			with open(path + '.failures.jsonl') as failures:
+				rows = [json.loads(line) for line in failures]
+			assert_equal([(r['row'], r.get('code')) for r in rows], [(2, 'malformed_row'), (3, 'malformed_row'), (4, None)])
+			assert_true(rows[1]['error'].startswith('Expected a JSON object'))
+		finally:
+			sys.path.remove(directory)
+	finally:
+		shutil.rmtree(directory)
+
+def test_profiler():
+	test_schema = {
+		u'name': IsName(),
+		u'age': [konval.types.IsType(int), konval.numbers.Minimum(18)],
+	}
+	original_call = konval.numbers.Range.__dict__['__call__'] if '__call__' in konval.numbers.Range.__dict__ else None
+	original_validate = konval.CompiledSchema.__dict__['validate']
+
+	with konval.profiling.Profiler() as profiler:
+		for age in [20, 5, 'x']:
+			konval.validate(test_schema, {u'name': u'Peter M. Elias', u'age': age})
+		konval.quick(IsName(), 123)
+
+	assert_true(konval.CompiledSchema.__dict__['validate'] is original_validate)
+	assert_equal(konval.numbers.Range.__dict__.get('__call__'), original_call)
+
+	assert_equal(sorted(profiler.fields), [u'age', u'name'])
+	age = profiler.fields[u'age']
+	assert_equal((age.calls, age.passes, age.fails), (6, 4, 2))
+	assert_true(age.total > 0)
+
+	name_calls = [s for s in profiler.validators.values() if s.label == 'IsName().__call__']
+	assert_equal([(s.calls, s.passes, s.fails) for s in name_calls], [(3, 3, 0)])
+	name_attempts = [s for s in profiler.validators.values() if s.label == 'IsName().attempt']
+	assert_equal([(s.calls, s.passes, s.fails) for s in name_attempts], [(1, 0, 1)])
+	for stats in profiler.validators.values():
+		assert_true(stats.own <= stats.total)
+
+	report = profiler.report()
+	assert_true('Fields by total time' in report)
+	assert_true('IsName().__call__' in report)
+
+	# classes created while profiling don't keep the profiler's wrappers
+	with konval.profiling.Profiler() as profiler:
+		class IsOdd(konval.Konvalidator):
+			def validate_value(self, value):
+				if not value % 2:
+					raise konval.ValidationError('%r is even', value)
+				return True
+	assert_true(IsOdd.__dict__['attempt'] is konval.Konvalidator.__dict__['attempt'])
+	assert_equal(IsOdd().attempt(3), (True, 3))
+	assert_equal(profiler.validators, {})
@@ -31,6 +31,9 @@ setup(name='konval',
 	],
 	entry_points="""
 	# -*- Entry points: -*-
+	[console_scripts]
+	konval-validate = konval.meta.cli:main
+	konval-build-synonyms = konval.meta.cli:build_synonyms
 	""",
 	test_suite='nose.collector',
 )